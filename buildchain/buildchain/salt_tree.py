@@ -208,7 +208,7 @@ SALT_FILES : Tuple[Union[Path, targets.AtomicTarget], ...] = (
                 },
             },
             'images': {
-                img.name: {'version': img.version}
+                img.name: {'version': img.version, 'digest': img.digest}
                 for img in versions.CONTAINER_IMAGES
             },
             'metalk8s': {'version': versions.VERSION},
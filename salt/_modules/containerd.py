@@ -3,9 +3,15 @@ Various functions to interact with :program:`containerd` using :command:`ctr`.
 '''
 
 import logging
+from multiprocessing.pool import ThreadPool
+import os.path
+import time
 
 log = logging.getLogger(__name__)
 
+# Default number of image archives imported concurrently
+IMPORT_CONCURRENCY = 4
+
 
 __virtualname__ = 'containerd'
 
@@ -26,6 +32,101 @@ def load_cri_image(path):
         Path of the Docker image archive to load
     '''
     log.info('Importing image from "%s" into CRI cache', path)
-    return __salt__['cmd.run_all'](
+    result = __salt__['cmd.run_all'](
         'ctr --debug -n k8s.io image import "{0}"'.format(path)
     )
+
+    if 'cri.invalidate_image_index' in __salt__:
+        __salt__['cri.invalidate_image_index']()
+
+    return result
+
+
+def _import_image(image):
+    """Import an image archive, recording time taken and size imported."""
+    name, path = image
+    start = time.time()
+    result = load_cri_image(path)
+    duration = time.time() - start
+
+    ret = {
+        'archive_path': path,
+        'duration': round(duration, 3),
+        'result': result['retcode'] == 0,
+    }
+    try:
+        ret['bytes'] = os.path.getsize(path)
+    except OSError:
+        ret['bytes'] = None
+    if not ret['result']:
+        ret['comment'] = result['stderr'] or result['stdout']
+
+    return name, ret
+
+
+def load_cri_images(images, concurrency=IMPORT_CONCURRENCY):
+    '''
+    Load Docker image archives into the :program:`containerd` CRI image cache.
+
+    Images already present are skipped (checked with a single image listing),
+    others are imported with up to `concurrency` imports in parallel.
+
+    Returns a dict with, for each image, whether it was `skipped`, the import
+    `result`, its `duration` (in seconds) and the archive size in `bytes`.
+
+    .. note::
+
+       This uses the :command:`ctr` command.
+
+    images
+        List of (image name, archive path) pairs, or dict of archive paths by
+        image name
+    concurrency
+        Maximum number of archives imported at once
+    '''
+    if isinstance(images, dict):
+        images = list(images.items())
+    images = [tuple(image) for image in images]
+
+    available = __salt__['cri.available_many'](
+        [name for name, _ in images]
+    )
+
+    ret = {}
+    to_import = []
+    for name, path in images:
+        if available[name]:
+            ret[name] = {
+                'archive_path': path,
+                'skipped': True,
+                'result': True,
+            }
+        else:
+            to_import.append((name, path))
+
+    if not to_import:
+        return ret
+
+    log.info(
+        'Importing %d images into CRI cache (%d already present)',
+        len(to_import), len(ret)
+    )
+    pool = ThreadPool(max(1, min(int(concurrency), len(to_import))))
+    try:
+        imported = pool.map(_import_image, to_import)
+    finally:
+        pool.close()
+        pool.join()
+
+    # ctr can fail to load the image and exit silently
+    available = __salt__['cri.available_many'](
+        [name for name, _ in to_import], refresh=True
+    )
+    for name, result in imported:
+        result['skipped'] = False
+        if result['result'] and not available[name]:
+            result['result'] = False
+            result['comment'] = 'Image not available after import'
+        ret[name] = result
+
+    return ret
@@ -4,13 +4,18 @@ Various functions to interact with a CRI daemon (through :program:`crictl`).
 
 import re
 import logging
+from multiprocessing.pool import ThreadPool
 import time
 
+from salt.ext import six
 import salt.utils.json
 
 
 log = logging.getLogger(__name__)
 
+# Default number of images pulled concurrently
+PULL_CONCURRENCY = 4
+
 
 __virtualname__ = 'cri'
 
@@ -37,31 +42,72 @@ def list_images():
     return salt.utils.json.loads(out['stdout'])['images']
 
 
-def available(name):
+def _get_image_index(refresh=False):
+    '''
+    Retrieve the index of tags and digests in the CRI image cache.
+
+    The index is kept in `__context__`, so that it is shared by all calls made
+    during a run, until invalidated (see `invalidate_image_index`).
+    '''
+    if refresh or 'cri.image_index' not in __context__:
+        images = list_images()
+        if images is None:
+            return None
+
+        index = {'tags': set(), 'digests': set()}
+        for image in images:
+            index['tags'].update(image.get('repoTags') or [])
+            index['digests'].update(image.get('repoDigests') or [])
+
+        __context__['cri.image_index'] = index
+
+    return __context__['cri.image_index']
+
+
+def invalidate_image_index():
+    '''
+    Drop the cached index of the CRI image cache, e.g. after loading images.
+    '''
+    __context__.pop('cri.image_index', None)
+
+
+def available(name, refresh=False):
     '''
     Check if given image exists in the containerd namespace image list
 
     name
         Name of the container image
+    refresh : False
+        Ignore the image index cached during this run
     '''
-    images = list_images()
-    available = False
-    if not images:
-        return False
+    return available_many([name], refresh=refresh)[name]
+
+
+def available_many(names, refresh=False):
+    '''
+    Check if given images exist in the containerd namespace image list
+
+    Returns a dict with the availability of each image.
+
+    names
+        List of container image names
+    refresh : False
+        Ignore the image index cached during this run
+    '''
+    index = _get_image_index(refresh=refresh)
+    if not index:
+        return dict((name, False) for name in names)
 
-    for image in images:
-        if name in image.get('repoTags', []):
-            available = True
-            break
-        if name in image.get('repoDigests', []):
-            available = True
-            break
-    return available
+    return dict(
+        (name, name in index['tags'] or name in index['digests'])
+        for name in names
+    )
 
 
+# Match the image reference printed by `crictl pull`
+# (e.g. "Image is up to date for sha256:<digest>")
 _PULL_RES = {
-    'sha256': re.compile(
-        r'Image is up to date for sha256:(?P<digest>[a-fA-F0-9]{64})'),
+    'sha256': re.compile(r'\bsha256:(?P<digest>[a-fA-F0-9]{64})\b'),
 }
 
 
@@ -79,26 +125,139 @@ def pull_image(image):
     '''
     log.info('Pulling CRI image "%s"', image)
     out = __salt__['cmd.run_all']('crictl pull "{0}"'.format(image))
+    invalidate_image_index()
 
     if out['retcode'] != 0:
         log.error('Failed to pull image "%s"', image)
         return None
 
     log.info('CRI image "%s" pulled', image)
-    stdout = out['stdout']
 
     ret = {
         'digests': {},
     }
 
     for (digest, regex) in _PULL_RES.items():
-        re_match = regex.match(stdout)
+        re_match = regex.search(out['stdout'])
         if re_match:
             ret['digests'][digest] = re_match.group('digest')
 
     return ret
 
 
+def _pull_one(image):
+    """Pull an image, recording the time taken."""
+    name, _ = image
+    start = time.time()
+    result = pull_image(name)
+    duration = time.time() - start
+
+    ret = {
+        'duration': round(duration, 3),
+        'result': result is not None,
+        'digests': result['digests'] if result else {},
+    }
+    if not ret['result']:
+        ret['comment'] = 'Failed to pull image'
+
+    return name, ret
+
+
+def _normalize_digest(digest):
+    if digest and ':' not in digest:
+        return 'sha256:{0}'.format(digest)
+    return digest
+
+
+def pull_images(images, concurrency=PULL_CONCURRENCY):
+    '''
+    Pull several images into the CRI image cache, in parallel.
+
+    Once pulled, the digest of each image is verified against the expected
+    one, if any (e.g. the `digest` of images in :file:`versions.json`).
+
+    Returns a dict with, for each image, the pull `result`, its `duration` (in
+    seconds), the image size in `bytes`, the resulting `throughput` (in bytes
+    per second), its `digests` (as returned by `pull_image`) and whether its
+    digest was `verified` (None if no digest was expected).
+
+    images
+        List of image names, list of (image name, expected digest) pairs, or
+        dict of expected digests by image name (digests can be None)
+    concurrency
+        Maximum number of images pulled at once
+    '''
+    if isinstance(images, dict):
+        images = list(images.items())
+    images = [
+        (image, None) if isinstance(image, six.string_types)
+        else tuple(image)
+        for image in images
+    ]
+    if not images:
+        return {}
+
+    log.info('Pulling %d CRI images', len(images))
+    pool = ThreadPool(max(1, min(int(concurrency), len(images))))
+    try:
+        pulled = dict(pool.map(_pull_one, images))
+    finally:
+        pool.close()
+        pool.join()
+
+    images_by_ref = {}
+    for image in list_images() or []:
+        for ref in [image['id']] + (image.get('repoTags') or []):
+            images_by_ref[ref] = image
+
+    for name, expected in images:
+        result = pulled[name]
+        result['verified'] = None
+        if not result['result']:
+            continue
+
+        image_id = 'sha256:{0}'.format(result['digests'].get('sha256'))
+        info = images_by_ref.get(image_id) or images_by_ref.get(name, {})
+        result['bytes'] = int(info['size']) if info.get('size') else None
+        result['throughput'] = None
+        if result['bytes'] is not None and result['duration'] > 0:
+            result['throughput'] = int(result['bytes'] / result['duration'])
+
+        expected = _normalize_digest(expected)
+        if expected:
+            repo_digests = [
+                digest.rpartition('@')[2]
+                for digest in info.get('repoDigests') or []
+            ]
+            result['verified'] = expected in repo_digests
+            if not result['verified']:
+                result['result'] = False
+                result['comment'] = (
+                    'Digest mismatch: expected {0}, got {1}'.format(
+                        expected, ', '.join(repo_digests) or 'none'
+                    )
+                )
+
+    return pulled
+
+
+def _list_containers(name, state='running'):
+    '''
+    List IDs of the containers with the given name (and state, if any).
+
+    Returns `None` if containers could not be listed.
+    '''
+    opts = '--label io.kubernetes.container.name="{0}"'.format(name)
+    if state is not None:
+        opts += " --state {0}".format(state)
+
+    out = __salt__['cmd.run_all']('crictl ps -q {0}'.format(opts))
+    if out['retcode'] != 0:
+        return None
+
+    return out['stdout'].split()
+
+
 def execute(name, command, *args):
     '''
     Run a command in a container.
@@ -137,10 +296,18 @@ def execute(name, command, *args):
     return out['stdout']
 
 
-def wait_container(name, state, timeout=60, delay=5):
+def wait_container(name, state, timeout=60, delay=5, initial_delay=0.2):
     '''
     Wait for a container to be in given state.
 
+    Checks are made with an exponential backoff, from `initial_delay` up to
+    `delay` seconds between 2 checks, so that containers which are quickly
+    ready (e.g. restarted static Pods) are detected early.
+
+    Returns a dict with the `result` (True) and the time it took for the
+    container to reach the given state, `elapsed` (in seconds), or False if
+    it did not reach it within `timeout`.
+
     .. note::
 
        This uses the :command:`crictl` command, which should be configured
@@ -153,23 +320,35 @@ def wait_container(name, state, timeout=60, delay=5):
     timeout
         Maximum time in sec to wait for container to reach given state
     delay
-        Interval in sec between 2 checks
+        Maximum interval in sec between 2 checks
+    initial_delay
+        Interval in sec between the first 2 checks
     '''
     log.info('Waiting for container "%s" to be in state "%s"', name, state)
 
-    opts = '--label io.kubernetes.container.name="{0}"'.format(name)
-    if state is not None:
-        opts += " --state {0}".format(state)
-
-    for _ in range(0, timeout, delay):
-        out = __salt__['cmd.run_all']('crictl ps -q {0}'.format(opts))
-
-        if out['retcode'] == 0 and out['stdout']:
-            return True
-        time.sleep(delay)
-    else:
-        log.error('Failed to find container "%s" in state "%s"', name, state)
-        return False
+    start = time.time()
+    deadline = start + timeout
+    interval = min(initial_delay, delay)
+
+    while True:
+        # Like `crictl ps`, only consider running containers by default
+        if _list_containers(name, state=state or 'running'):
+            elapsed = time.time() - start
+            log.info(
+                'Container "%s" in state "%s" after %.3fs',
+                name, state, elapsed
+            )
+            return {'result': True, 'elapsed': round(elapsed, 3)}
+
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            log.error(
+                'Failed to find container "%s" in state "%s"', name, state
+            )
+            return False
+
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, delay)
 
 
 def component_is_running(name):
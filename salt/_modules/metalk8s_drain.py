@@ -8,17 +8,22 @@ This module's functions are merged into the `metalk8s_kubernetes`
 module when called by salt by virtue of its `__virtualname__` attribute.
 '''
 
+import functools
 import logging
+from multiprocessing.pool import ThreadPool
 import operator
 import time
 
 from salt.exceptions import CommandExecutionError
+from salt.ext import six
 
 try:
+    from kubernetes.client import CoreV1Api
     from kubernetes.client.rest import ApiException
     from kubernetes.client.models.v1_delete_options import V1DeleteOptions
     from kubernetes.client.models.v1_object_meta import V1ObjectMeta
     from kubernetes.client.models.v1beta1_eviction import V1beta1Eviction
+    from kubernetes.watch import Watch
     from urllib3.exceptions import HTTPError
 
     HAS_LIBS = True
@@ -58,6 +63,15 @@ class DrainTimeoutException(DrainException):
     pass
 
 
+class EvictionBlockedError(CommandExecutionError):
+    '''Eviction refused with a "429 Too Many Requests" by the API.
+
+    This happens when the eviction would violate a PodDisruptionBudget, and
+    the eviction should be retried later.
+    '''
+    pass
+
+
 def _mirrorpod_filter(pod):
     '''Check if a pod contains the mirror K8s annotation.
 
@@ -133,6 +147,15 @@ class Drain(object):
 
     # According to `kubectl` code, this value should be 1 second by default
     KUBECTL_INTERVAL = 1
+    # Interval between eviction attempts of a pod protected by a
+    # PodDisruptionBudget, 5 seconds as in `kubectl` code
+    EVICTION_RETRY_INTERVAL = 5
+    # Maximum duration of a single pods watch request, in seconds
+    WATCH_TIMEOUT = 300
+    # Number of distinct controllers of a kind, referenced by pods from the
+    # same namespace, from which they are retrieved with one list of this kind
+    # in this namespace, rather than one request per controller
+    CONTROLLER_PREFETCH_THRESHOLD = 3
     WARNING_MSG = {
         "daemonset": "Ignoring DaemonSet-managed pods",
         "localStorage": "Deleting pods with local storage",
@@ -156,6 +179,8 @@ class Drain(object):
                  ignore_daemonset=False,
                  timeout=0,
                  delete_local_data=False,
+                 max_parallel_evictions=10,
+                 use_watch=True,
                  **kwargs):
         self._node_name = node_name
         self._force = force
@@ -163,7 +188,17 @@ class Drain(object):
         self._ignore_daemonset = ignore_daemonset
         self._timeout = timeout or (2 ** 64 - 1)
         self._delete_local_data = delete_local_data
+        self._max_parallel_evictions = max(1, int(max_parallel_evictions))
+        self._use_watch = use_watch
         self._kwargs = kwargs
+        # Controllers cache, keyed by (namespace, kind, name)
+        self._controllers = {}
+        # Controller kinds in a namespace, as (apiVersion, kind, namespace),
+        # entirely listed in cache
+        self._prefetched = set()
+        self._controller_lookups = 0
+        self._controller_api_calls = 0
+        self._controllers_listed = 0
 
     node_name = property(operator.attrgetter('_node_name'))
     force = property(operator.attrgetter('_force'))
@@ -171,6 +206,15 @@ class Drain(object):
     ignore_daemonset = property(operator.attrgetter('_ignore_daemonset'))
     timeout = property(operator.attrgetter('_timeout'))
     delete_local_data = property(operator.attrgetter('_delete_local_data'))
+    max_parallel_evictions = property(
+        operator.attrgetter('_max_parallel_evictions')
+    )
+    use_watch = property(operator.attrgetter('_use_watch'))
+
+    @property
+    def controller_api_calls_avoided(self):
+        '''Number of API calls saved by the controllers cache.'''
+        return self._controller_lookups - self._controller_api_calls
 
     def localstorage_filter(self, pod):
         '''Compute eviction status for the pod according to local storage.
@@ -215,6 +259,9 @@ class Drain(object):
     def get_controller(self, namespace, controller_ref):
         '''Get the controller object from a reference to it
 
+        Controllers are cached for the whole drain, since pods often share
+        the same controller.
+
         Args:
           - namespace: the queried controller's namespace
           - controller_ref: the queried controller's reference
@@ -223,13 +270,85 @@ class Drain(object):
           - None if not found
         Raises: CommandExecutionError if API fails
         '''
-        return __salt__['metalk8s_kubernetes.get_object'](
+        self._controller_lookups += 1
+        key = (namespace, controller_ref['kind'], controller_ref['name'])
+
+        if key in self._controllers:
+            return self._controllers[key]
+
+        if (controller_ref['api_version'], controller_ref['kind'],
+                namespace) in self._prefetched:
+            # Not found when listing the controllers of this kind
+            return None
+
+        self._controller_api_calls += 1
+        controller = __salt__['metalk8s_kubernetes.get_object'](
             name=controller_ref['name'],
             kind=controller_ref['kind'],
             apiVersion=controller_ref['api_version'],
             namespace=namespace,
             **self._kwargs
         )
+        self._controllers[key] = controller
+        return controller
+
+    def prefetch_controllers(self, pods):
+        '''Fill the controllers cache with one list per controller kind and
+        namespace, when enough controllers are referenced to be worth it.
+
+        Kinds which cannot be listed are ignored, their controllers being
+        retrieved one by one when needed.
+
+        Args:
+          - pods: the pods for which controllers will be looked up
+        '''
+        referenced = {}
+        for pod in pods:
+            controller_ref = _get_controller_of(pod)
+            if controller_ref is not None:
+                referenced.setdefault(
+                    (controller_ref['api_version'], controller_ref['kind'],
+                     pod['metadata']['namespace']),
+                    set()
+                ).add(controller_ref['name'])
+
+        for group, names in referenced.items():
+            if len(names) >= self.CONTROLLER_PREFETCH_THRESHOLD and \
+                    group not in self._prefetched:
+                self.prefetch_kind(*group)
+
+    def prefetch_kind(self, api_version, kind, namespace):
+        '''Fill the controllers cache with all controllers of a kind in a
+        namespace.
+
+        Args:
+          - api_version: the controller kind API version
+          - kind: the controller kind
+          - namespace: the controllers namespace
+        '''
+        controllers = {}
+        stats = {}
+        try:
+            for controller in __salt__['metalk8s_kubernetes.iter_objects'](
+                    kind=kind,
+                    apiVersion=api_version,
+                    namespace=namespace,
+                    stats=stats,
+                    **self._kwargs):
+                key = (namespace, kind, controller['metadata']['name'])
+                controllers[key] = controller
+        except CommandExecutionError as exc:
+            log.debug(
+                "Unable to list %s/%s controllers in namespace %s: %s",
+                api_version, kind, namespace, exc
+            )
+            return
+        finally:
+            self._controller_api_calls += stats.get('pages', 0)
+
+        self._controllers_listed += len(controllers)
+        self._controllers.update(controllers)
+        self._prefetched.add((api_version, kind, namespace))
 
     def get_pod_controller(self, pod):
         '''Get a pod's controller object reference
@@ -297,34 +416,16 @@ class Drain(object):
         failures = {}
         pods = []
 
-        all_pods = __salt__['metalk8s_kubernetes.list_objects'](
+        node_pods = list(__salt__['metalk8s_kubernetes.iter_objects'](
             kind='Pod',
             apiVersion='v1',
             all_namespaces=True,
             field_selector='spec.nodeName={0}'.format(self.node_name),
             **self._kwargs
-        )
-
-        for pod in all_pods:
-            is_deletable = True
-            for pod_filter in (
-                    _mirrorpod_filter,
-                    self.localstorage_filter,
-                    self.unreplicated_filter,
-                    self.daemonset_filter
-            ):
-                try:
-                    filter_deletable, warning = pod_filter(pod)
-                except DrainException as exc:
-                    failures.setdefault(
-                        exc.message, []).append(pod['metadata']['name'])
-
-                if warning:
-                    warnings.setdefault(
-                        warning, []).append(pod['metadata']['name'])
-                is_deletable &= filter_deletable
-            if is_deletable:
-                pods.append(pod)
+        ))
+        self.prefetch_controllers(node_pods)
+        for pod in node_pods:
+            self._filter_pod(pod, pods, warnings, failures)
 
         if failures:
             raise DrainException(_message_from_pods_dict(failures))
@@ -332,7 +433,33 @@ class Drain(object):
             log.warning("WARNING: %s", _message_from_pods_dict(warnings))
         return pods
 
-    def run_drain(self, dry_run=False):
+    def _filter_pod(self, pod, pods, warnings, failures):
+        '''Apply eviction filters to a pod.
+
+        Deletable pods are appended to `pods`, warnings and failures are
+        recorded in the `warnings` and `failures` dicts.
+        '''
+        is_deletable = True
+        for pod_filter in (
+                _mirrorpod_filter,
+                self.localstorage_filter,
+                self.unreplicated_filter,
+                self.daemonset_filter
+        ):
+            try:
+                filter_deletable, warning = pod_filter(pod)
+            except DrainException as exc:
+                failures.setdefault(
+                    exc.message, []).append(pod['metadata']['name'])
+
+            if warning:
+                warnings.setdefault(
+                    warning, []).append(pod['metadata']['name'])
+            is_deletable &= filter_deletable
+        if is_deletable:
+            pods.append(pod)
+
+    def run_drain(self, dry_run=False, pods=None):
         '''Drain the targeted node.
 
         In practice, we check the node for unevictable pods according to
@@ -342,11 +469,14 @@ class Drain(object):
         Args:
           - dry_run: dry run mode, where evictable pods will be computed
                      but no eviction will be triggered.
+          - pods: pods to evict, as returned by `get_pods_for_eviction`, if
+                  already computed
         Returns: string message
         Raises: CommandExecutionError in case of timeout or eviction failure
         '''
         try:
-            pods = self.get_pods_for_eviction()
+            if pods is None:
+                pods = self.get_pods_for_eviction()
         except DrainException as exc:
             raise CommandExecutionError(
                 (
@@ -359,9 +489,10 @@ class Drain(object):
             )
 
         if dry_run:
-            return "Prepared for eviction of pods: {0}".format(
+            return "Prepared for eviction of pods: {0} ({1})".format(
                 ", ".join([pod['metadata']['name'] for pod in pods])
-                if pods else "no pods to evict."
+                if pods else "no pods to evict.",
+                self._summary()
             )
 
         try:
@@ -380,55 +511,225 @@ class Drain(object):
                 ),
                 [pod['metadata']['name'] for pod in remaining_pods]
             )
-        return "Eviction complete."
+        return "Eviction complete ({0}).".format(self._summary())
+
+    def _summary(self):
+        return (
+            "{0} controller API calls avoided, {1} controllers listed".format(
+                self.controller_api_calls_avoided, self._controllers_listed
+            )
+        )
 
     def evict_pods(self, pods):
         '''Trigger the eviction process for all pods passed.
 
+        Evictions are issued concurrently, using at most
+        `max_parallel_evictions` workers.
+
         Args:
           - pods: list of Kubernetes API pods to evict
         Returns: None
         Raises: DrainTimeoutException if the eviction process is not complete
                 after the specified timeout value
         '''
-        for pod in pods:
-            # TODO: "too many requests" error not handled
-            _ = evict_pod(
-                name=pod['metadata']['name'],
-                namespace=pod['metadata']['namespace'],
-                grace_period=self.grace_period,
-                **self._kwargs
+        deadline = time.time() + self.timeout
+
+        if pods:
+            pool = ThreadPool(
+                processes=min(self.max_parallel_evictions, len(pods))
             )
+            try:
+                pool.map(
+                    functools.partial(
+                        self.evict_pod_with_retry, deadline=deadline
+                    ),
+                    pods
+                )
+            finally:
+                pool.close()
+                pool.join()
 
-        pending = self.wait_for_eviction(pods)
+        pending = self.wait_for_eviction(
+            pods, timeout=max(0, deadline - time.time())
+        )
 
         if pending:
             raise DrainTimeoutException(
                 "Drain did not complete within {0}".format(self.timeout)
             )
 
-    def wait_for_eviction(self, pods):
+    def evict_pod_with_retry(self, pod, deadline):
+        '''Trigger the eviction of a pod, retrying while it is blocked.
+
+        Args:
+          - pod: the Kubernetes API pod to evict
+          - deadline: time after which we stop retrying
+        Returns: None
+        Raises: DrainTimeoutException if the pod eviction is still blocked by
+                a PodDisruptionBudget at `deadline`
+        '''
+        while True:
+            try:
+                evict_pod(
+                    name=pod['metadata']['name'],
+                    namespace=pod['metadata']['namespace'],
+                    grace_period=self.grace_period,
+                    **self._kwargs
+                )
+            except EvictionBlockedError:
+                if time.time() + self.EVICTION_RETRY_INTERVAL > deadline:
+                    raise DrainTimeoutException(
+                        "Eviction of pod '{0}' still blocked after {1}".format(
+                            pod['metadata']['name'], self.timeout
+                        )
+                    )
+                log.info(
+                    "Eviction of pod %s blocked by a PodDisruptionBudget, "
+                    "retrying in %s seconds",
+                    pod['metadata']['name'], self.EVICTION_RETRY_INTERVAL
+                )
+                time.sleep(self.EVICTION_RETRY_INTERVAL)
+            else:
+                return
+
+    def wait_for_eviction(self, pods, timeout=None):
         '''Wait for pods deletion.
 
+        If `use_watch` is set, a single watch on the node pods is used to
+        follow deletions, falling back to polling if the watch breaks.
+
         Args:
           - pods: the list of pods on which eviction was triggered, for which
                   we wait until they are no longer present in API queries.
+          - timeout: time to wait for, defaults to the drain timeout
+        Returns: the list of remaining pods after timeout
+        '''
+        if timeout is None:
+            timeout = self.timeout
+
+        if self.use_watch and pods:
+            start = time.time()
+            try:
+                return self.watch_for_eviction(pods, timeout)
+            except (ApiException, HTTPError) as exc:
+                log.warning(
+                    "Watch on pods of node %s failed, falling back to "
+                    "polling: %s", self.node_name, exc
+                )
+            timeout = max(0, timeout - (time.time() - start))
+
+        return self.poll_for_eviction(pods, timeout)
+
+    def _pod_api(self):
+        kubeconfig, context = __salt__[
+            'metalk8s_kubernetes.get_kubeconfig'
+        ](**self._kwargs)
+        return CoreV1Api(
+            api_client=__utils__['metalk8s_kubernetes.get_api_client'](
+                config_file=kubeconfig, context=context
+            )
+        )
+
+    def watch_for_eviction(self, pods, timeout):
+        '''Wait for pods deletion, using a watch on the node pods.
+
+        Pods are considered evicted once a DELETED event is received for
+        them, or once a pod with the same name but another UID shows up.
+
+        Args:
+          - pods: the list of pods on which eviction was triggered
+          - timeout: time to wait for
+        Returns: the list of remaining pods after timeout
+        Raises: ApiException or HTTPError if the watch breaks
+        '''
+        deadline = time.time() + timeout
+        pending = dict((pod['metadata']['uid'], pod) for pod in pods)
+        field_selector = 'spec.nodeName={0}'.format(self.node_name)
+        api = self._pod_api()
+
+        def _evicted(uid):
+            pod = pending.pop(uid, None)
+            if pod is not None:
+                log.info("%s evicted", pod['metadata']['name'])
+
+        def _seen(pod_obj):
+            # A pod with the same name and a new UID replaced an evicted one
+            for uid, pod in list(pending.items()):
+                if uid != pod_obj.metadata.uid and \
+                        pod['metadata']['name'] == pod_obj.metadata.name and \
+                        pod['metadata']['namespace'] == \
+                        pod_obj.metadata.namespace:
+                    _evicted(uid)
+
+        while pending and time.time() < deadline:
+            # (Re-)synchronize the state of pending pods, and retrieve the
+            # resource version to start watching from
+            pod_list = api.list_pod_for_all_namespaces(
+                field_selector=field_selector
+            )
+            current_uids = set()
+            for pod_obj in pod_list.items:
+                current_uids.add(pod_obj.metadata.uid)
+                _seen(pod_obj)
+            for uid in set(pending) - current_uids:
+                _evicted(uid)
+
+            if not pending:
+                break
+
+            watch_timeout = max(1, int(min(
+                deadline - time.time(), self.WATCH_TIMEOUT
+            )))
+            watcher = Watch()
+            for event in watcher.stream(
+                    api.list_pod_for_all_namespaces,
+                    field_selector=field_selector,
+                    resource_version=pod_list.metadata.resource_version,
+                    timeout_seconds=watch_timeout):
+                if event['type'] == 'ERROR':
+                    # e.g. resource version too old, re-list
+                    log.debug(
+                        "Error event while watching pods of node %s: %s",
+                        self.node_name, event['raw_object']
+                    )
+                    break
+                pod_obj = event['object']
+                if event['type'] == 'DELETED':
+                    _evicted(pod_obj.metadata.uid)
+                else:
+                    _seen(pod_obj)
+                if not pending or time.time() >= deadline:
+                    break
+            watcher.stop()
+
+        return list(pending.values())
+
+    def poll_for_eviction(self, pods, timeout):
+        '''Wait for pods deletion, listing the node pods periodically.
+
+        Args:
+          - pods: the list of pods on which eviction was triggered
+          - timeout: time to wait for
         Returns: the list of remaining pods after timeout
         '''
         total_t = 0
-        while total_t < self.timeout and pods:
-            pending = []
+        while total_t < timeout and pods:
             iteration_start = time.time()    # For time processing pods
-            for pod in pods:
-                response = __salt__['metalk8s_kubernetes.get_object'](
+            current_uids = set(
+                pod['metadata']['uid']
+                for pod in __salt__['metalk8s_kubernetes.iter_objects'](
                     kind='Pod',
                     apiVersion='v1',
-                    name=pod['metadata']['name'],
-                    namespace=pod['metadata']['namespace'],
+                    all_namespaces=True,
+                    field_selector='spec.nodeName={0}'.format(
+                        self.node_name
+                    ),
                     **self._kwargs
                 )
-                if not response or \
-                        response['metadata']['uid'] != pod['metadata']['uid']:
+            )
+            pending = []
+            for pod in pods:
+                if pod['metadata']['uid'] not in current_uids:
                     log.info("%s evicted", pod['metadata']['name'])
                 else:
                     pending.append(pod)
@@ -485,6 +786,12 @@ def evict_pod(name, namespace='default', grace_period=1,
         if isinstance(exc, ApiException) and exc.status == 404:
             return None
 
+        if isinstance(exc, ApiException) and exc.status == 429:
+            raise EvictionBlockedError(
+                'Eviction of pod "{}" in namespace "{}" is blocked, retry '
+                'later: {!s}'.format(name, namespace, exc)
+            )
+
         raise CommandExecutionError(
             'Failed to evict pod "{}" in namespace "{}": {!s}'.format(
                 name, namespace, exc
@@ -501,16 +808,22 @@ def node_drain(node_name,
                timeout=0,
                delete_local_data=False,
                dry_run=False,
+               max_parallel_evictions=10,
+               use_watch=True,
                **kwargs):
     '''Trigger the drain process for a node.
 
     Args:
-      - force             : ignore unreplicated pods (i.e. StaticPod pods)
-      - grace_period      : eviction grace period
-      - ignore_daemonset  : ignore daemonsets in eviction process
-      - timeout           : drain process timeout value
-      - delete_local_data : force deletion for pods with local storage
-      - dry_run           : only run pod selection process, not eviction
+      - force                  : ignore unreplicated pods (i.e. StaticPod pods)
+      - grace_period           : eviction grace period
+      - ignore_daemonset       : ignore daemonsets in eviction process
+      - timeout                : drain process timeout value
+      - delete_local_data      : force deletion for pods with local storage
+      - dry_run                : only run pod selection process, not eviction
+      - max_parallel_evictions : maximum number of evictions issued
+                                 concurrently
+      - use_watch              : watch pods to follow their deletion, instead
+                                 of polling
 
     Keyword args: connection parameters, passed through to connection utility
                   module.
@@ -525,8 +838,250 @@ def node_drain(node_name,
         ignore_daemonset=ignore_daemonset,
         timeout=timeout,
         delete_local_data=delete_local_data,
+        max_parallel_evictions=max_parallel_evictions,
+        use_watch=use_watch,
         **kwargs
     )
     __salt__['metalk8s_kubernetes.cordon_node'](node_name, **kwargs)
 
     return drainer.run_drain(dry_run=dry_run)
+
+
+def _match_selector(selector, labels):
+    '''Check if a label selector matches the given labels.
+
+    Args:
+      - selector: a label selector as dict (with `match_labels` and
+                  `match_expressions`)
+      - labels: the labels to match
+    Returns: True if the selector matches the labels, False if not
+    '''
+    # An empty selector matches no pods (`policy/v1beta1` semantics)
+    if not selector or not (
+            selector.get('match_labels') or
+            selector.get('match_expressions')):
+        return False
+    labels = labels or {}
+
+    for key, value in (selector.get('match_labels') or {}).items():
+        if labels.get(key) != value:
+            return False
+
+    for expression in selector.get('match_expressions') or []:
+        key = expression['key']
+        operator_ = expression['operator']
+        values = expression.get('values') or []
+        if operator_ == 'In' and labels.get(key) not in values:
+            return False
+        if operator_ == 'NotIn' and key in labels and labels[key] in values:
+            return False
+        if operator_ == 'Exists' and key not in labels:
+            return False
+        if operator_ == 'DoesNotExist' and key in labels:
+            return False
+
+    return True
+
+
+def _plan_drain_waves(pods_by_node, pdbs, max_parallel_nodes):
+    '''Split nodes into waves of nodes to drain concurrently.
+
+    A wave holds at most `max_parallel_nodes` nodes, and nodes holding pods
+    covered by the same PodDisruptionBudget are only grouped if, together,
+    they do not exceed the disruptions it allows.
+
+    Args:
+      - pods_by_node: dict of node name to list of pods to evict
+      - pdbs: list of PodDisruptionBudget objects
+      - max_parallel_nodes: maximum number of nodes in a wave
+    Returns: a list of waves, as lists of node names
+    '''
+    def _pdb_usage(pods):
+        usage = {}
+        for index, pdb in enumerate(pdbs):
+            count = sum(
+                1 for pod in pods
+                if pod['metadata']['namespace'] ==
+                pdb['metadata']['namespace'] and
+                _match_selector(
+                    pdb['spec'].get('selector'), pod['metadata']['labels']
+                )
+            )
+            if count:
+                usage[index] = count
+        return usage
+
+    waves = []
+    for node in sorted(pods_by_node):
+        node_usage = _pdb_usage(pods_by_node[node])
+        for wave in waves:
+            if len(wave['nodes']) >= max_parallel_nodes:
+                continue
+            if all(
+                    not wave['usage'].get(index) or
+                    wave['usage'][index] + count <=
+                    ((pdbs[index].get('status') or {}).get(
+                        'disruptions_allowed') or 0)
+                    for index, count in node_usage.items()):
+                wave['nodes'].append(node)
+                for index, count in node_usage.items():
+                    wave['usage'][index] = \
+                        wave['usage'].get(index, 0) + count
+                break
+        else:
+            waves.append({'nodes': [node], 'usage': node_usage})
+
+    return [wave['nodes'] for wave in waves]
+
+
+def nodes_drain(node_names,
+                max_parallel_nodes=2,
+                force=False,
+                grace_period=1,
+                ignore_daemonset=False,
+                timeout=0,
+                delete_local_data=False,
+                dry_run=False,
+                max_parallel_evictions=10,
+                use_watch=True,
+                **kwargs):
+    '''Trigger the drain process for several nodes, concurrently.
+
+    All nodes are first cordoned and checked for non-evictable pods, and
+    nothing is drained if any is found. Nodes are then drained in successive
+    waves of at most `max_parallel_nodes` nodes, nodes holding pods covered by
+    the same PodDisruptionBudget being only drained together if the budget
+    allows it.
+
+    Args:
+      - node_names             : list of nodes to drain
+      - max_parallel_nodes     : maximum number of nodes drained concurrently
+      - dry_run                : only run pod selection and planning, not
+                                 eviction
+
+    Other arguments are the same as for `node_drain`, and apply to each node.
+
+    Keyword args: connection parameters, passed through to connection utility
+                  module.
+    Returns: a dict with drain result and duration per node
+    Raises: CommandExecutionError if the drain process was unsuccessful
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt-run salt.cmd metalk8s_kubernetes.nodes_drain '["node1", "node2"]' ignore_daemonset=True
+    '''
+    if isinstance(node_names, six.string_types):
+        node_names = [node_names]
+
+    drainers = dict(
+        (node_name, Drain(
+            node_name,
+            force=force,
+            grace_period=grace_period,
+            ignore_daemonset=ignore_daemonset,
+            timeout=timeout,
+            delete_local_data=delete_local_data,
+            max_parallel_evictions=max_parallel_evictions,
+            use_watch=use_watch,
+            **kwargs
+        ))
+        for node_name in node_names
+    )
+
+    if not dry_run:
+        # Cordon all nodes first, so that no pod gets scheduled on them after
+        # they were checked, nor moved from a node to another one to drain
+        for node_name in node_names:
+            __salt__['metalk8s_kubernetes.cordon_node'](node_name, **kwargs)
+
+    # Check that all nodes can be drained before draining any of them
+    pods_by_node = {}
+    failures = []
+    for node_name, drainer in drainers.items():
+        try:
+            pods_by_node[node_name] = drainer.get_pods_for_eviction()
+        except DrainException as exc:
+            failures.append('{0}: {1}'.format(node_name, exc.message))
+    if failures:
+        raise CommandExecutionError(
+            (
+                "The following are not deletable: {0}. "
+                "You can ignore DaemonSet pods with the "
+                "ignore_daemonset flag."
+            ).format('; '.join(failures))
+        )
+
+    pdbs = __salt__['metalk8s_kubernetes.list_objects'](
+        kind='PodDisruptionBudget',
+        apiVersion='policy/v1beta1',
+        all_namespaces=True,
+        **kwargs
+    )
+    waves = _plan_drain_waves(
+        pods_by_node, pdbs, max(1, int(max_parallel_nodes))
+    )
+
+    if dry_run:
+        return dict(
+            (node_name, {
+                'wave': index,
+                'pods': [pod['metadata']['name'] for pod in pods_by_node[
+                    node_name
+                ]],
+            })
+            for index, wave in enumerate(waves)
+            for node_name in wave
+        )
+
+    def _drain(node_name):
+        start = time.time()
+        try:
+            result = drainers[node_name].run_drain(
+                pods=pods_by_node[node_name]
+            )
+        except (CommandExecutionError, DrainException) as exc:
+            return node_name, False, exc.message, time.time() - start
+        except Exception as exc:  # pylint: disable=broad-except
+            return node_name, False, str(exc), time.time() - start
+        return node_name, True, result, time.time() - start
+
+    results = {}
+    failed = []
+    pool = ThreadPool(processes=min(
+        max(len(wave) for wave in waves) if waves else 1,
+        max(1, int(max_parallel_nodes))
+    ))
+    try:
+        for index, wave in enumerate(waves):
+            if failed:
+                for node_name in wave:
+                    results[node_name] = {
+                        'result': False,
+                        'comment': 'Not drained, previous wave failed',
+                        'wave': index,
+                        'duration': 0,
+                    }
+                continue
+            for node_name, success, comment, duration in pool.map(
+                    _drain, wave):
+                results[node_name] = {
+                    'result': success,
+                    'comment': comment,
+                    'wave': index,
+                    'duration': round(duration, 3),
+                }
+                if not success:
+                    failed.append(node_name)
+    finally:
+        pool.close()
+        pool.join()
+
+    if failed:
+        raise CommandExecutionError(
+            'Failed to drain nodes: {0}'.format(', '.join(sorted(failed))),
+            results
+        )
+
+    return results
@@ -2,7 +2,16 @@
 '''
 Module for handling etcd client specific calls.
 '''
+from contextlib import contextmanager
+import functools
+import gzip
+import hashlib
 import logging
+from multiprocessing.pool import ThreadPool
+import os
+import os.path
+import threading
+import time
 from urlparse import urlparse
 
 from salt.exceptions import CommandExecutionError
@@ -10,6 +19,8 @@ from salt.exceptions import CommandExecutionError
 PYTHON_ETCD_PRESENT = False
 try:
     import etcd3
+    from etcd3 import etcdrpc
+    import grpc
     PYTHON_ETCD_PRESENT = True
 except ImportError:
     pass
@@ -17,6 +28,22 @@ except ImportError:
 # Timeout when connection to etcd server
 TIMEOUT = 30
 
+# Idle time (in seconds) after which a pooled etcd client gets closed
+CLIENT_POOL_IDLE_TIMEOUT = 300
+
+# Timeout when defragmenting a member, which blocks it while rewriting its
+# whole database
+DEFRAG_TIMEOUT = 300
+
+# Number of revisions kept when compacting the keyspace
+RETAINED_REVISIONS = 10000
+
+# Timeout when streaming a snapshot of the etcd database
+SNAPSHOT_TIMEOUT = 3600
+
+# Size (in bytes) of the chunks written to disk when saving a snapshot
+SNAPSHOT_CHUNK_SIZE = 1024 * 1024
+
 
 log = logging.getLogger(__name__)
 
@@ -30,8 +57,148 @@ def __virtual__():
         return False, "python-etcd3 not available"
 
 
-def _get_endpoint_up(ca_cert, cert_key, cert_cert, nodes=None):
-    """Pick an answering etcd endpoint among all etcd servers."""
+# Fallback for process-wide state, if `metalk8s_kubernetes` utils are not
+# available (these globals are reset whenever the loader is built again)
+_LOCAL_STATE = {}
+_LOCAL_STATE_LOCK = threading.Lock()
+
+def _get_process_state(name, factory):
+    """Return a process-wide object, built with `factory` on first use.
+
+    Pooled clients and known endpoints must outlive this module, which is
+    executed again on every pillar compilation on the salt-master.
+    """
+    get_process_state = __utils__.get('metalk8s_kubernetes.get_process_state')
+    if get_process_state is not None:
+        return get_process_state('metalk8s_etcd.{}'.format(name), factory)
+
+    with _LOCAL_STATE_LOCK:
+        if name not in _LOCAL_STATE:
+            _LOCAL_STATE[name] = factory()
+        return _LOCAL_STATE[name]
+
+
+def _get_client_pool():
+    """Return pooled etcd clients, with their lock.
+
+    Clients (and their last use time) are keyed by endpoint and certificates
+    (with their mtime, so that renewed certificates are used).
+    """
+    return (_get_process_state('client_pool', dict),
+            _get_process_state('client_pool_lock', threading.Lock))
+
+
+def _get_last_good_endpoints():
+    """Return the last etcd endpoint which answered, keyed by certificates."""
+    return _get_process_state('last_good_endpoints', dict)
+
+
+def _get_known_members():
+    """Return client endpoints of etcd members, by name, as last listed."""
+    return _get_process_state('member_endpoints', dict)
+
+
+def _get_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except (OSError, TypeError):
+        return None
+
+
+def _get_client(host, port, ca_cert, cert_key, cert_cert):
+    """Return an etcd client from the pool, creating it if needed.
+
+    Clients keep their gRPC channel (and TLS session) open, so they must not
+    be closed by callers.
+    """
+    certs = (ca_cert, cert_key, cert_cert)
+    key = (host, port) + certs + tuple(_get_mtime(path) for path in certs)
+    now = time.time()
+    pool, lock = _get_client_pool()
+
+    with lock:
+        for pool_key, (client, last_used) in list(pool.items()):
+            if now - last_used > CLIENT_POOL_IDLE_TIMEOUT:
+                del pool[pool_key]
+                client.close()
+
+        entry = pool.get(key)
+        if entry is not None:
+            entry[1] = now
+            return entry[0]
+
+        log.debug('Opening new etcd client for %s:%s', host, port)
+        client = etcd3.client(host=host,
+                              port=port,
+                              ca_cert=ca_cert,
+                              cert_key=cert_key,
+                              cert_cert=cert_cert,
+                              timeout=TIMEOUT)
+        pool[key] = [client, now]
+
+    return client
+
+
+def _discard_client(client):
+    """Remove a client from the pool and close it."""
+    pool, lock = _get_client_pool()
+    with lock:
+        for pool_key, (pooled, _) in list(pool.items()):
+            if pooled is client:
+                del pool[pool_key]
+    client.close()
+
+
+@contextmanager
+def _etcd_client(host, ca_cert, cert_key, cert_cert, port=2379):
+    """Use a pooled etcd client, discarding it on connection errors."""
+    client = _get_client(host, port, ca_cert, cert_key, cert_cert)
+    try:
+        yield client
+    except (etcd3.exceptions.ConnectionFailedError,
+            etcd3.exceptions.ConnectionTimeoutError):
+        _discard_client(client)
+        raise
+
+
+def _update_members_cache(members):
+    """Remember the client endpoint (host) of each started etcd member."""
+    endpoints = dict(
+        (member.name, urlparse(member.client_urls[0]).hostname)
+        for member in members
+        if member.name and member.client_urls
+    )
+    known_members = _get_known_members()
+    # Update in place, so that readers never see an empty cache
+    known_members.update(endpoints)
+    for name in set(known_members) - set(endpoints):
+        known_members.pop(name, None)
+
+
+def _get_member_endpoints():
+    """Return known client endpoints of etcd members, by member name.
+
+    Endpoints come from the last listed etcd members if any, or from the
+    `metalk8s.etcd.members` pillar as a bootstrap hint.
+    """
+    known_members = dict(_get_known_members())
+    if known_members:
+        return known_members
+
+    members = __pillar__.get('metalk8s', {}).get('etcd', {}).get('members')
+    return dict(
+        (member['name'], urlparse(member['client_urls'][0]).hostname)
+        for member in members or []
+        if member.get('name') and member.get('client_urls')
+    )
+
+
+def _get_mine_endpoints(nodes=None):
+    """Return control-plane IPs of etcd minions, by minion ID, from the mine.
+
+    This is slow (it fetches mine data of all minions), so only meant to be
+    used when etcd members are not known yet.
+    """
     etcd_hosts = __salt__['metalk8s.minions_by_role']('etcd', nodes=nodes)
 
     # Get host ip from etcd_hosts
@@ -40,28 +207,68 @@ def _get_endpoint_up(ca_cert, cert_key, cert_cert, nodes=None):
         tgt='*',
         fun='control_plane_ip'
     )
-    endpoints = [
-        cp_ips[host]
+    return dict(
+        (host, cp_ips[host])
         for host in etcd_hosts
         if host in cp_ips
-    ]
+    )
+
+
+def _get_endpoint_up(ca_cert, cert_key, cert_cert, nodes=None):
+    """Pick an answering etcd endpoint among all etcd servers.
+
+    The last endpoint which answered is tried first, then known etcd members
+    (see `_get_member_endpoints`), and only then etcd minions from the mine.
+    Members are listed on the answering endpoint, to keep them up to date.
+
+    `nodes` only restricts the etcd minions looked up in the mine: known
+    members are always tried, whether or not they are part of `nodes`.
+    """
+    certs = (ca_cert, cert_key, cert_cert)
+    last_good_endpoints = _get_last_good_endpoints()
+    tried = set()
+
+    def _candidates():
+        yield last_good_endpoints.get(certs)
+        for endpoint in sorted(_get_member_endpoints().values()):
+            yield endpoint
+        # Cold path, no member is known or none answered
+        for endpoint in sorted(_get_mine_endpoints(nodes=nodes).values()):
+            yield endpoint
+
+    for endpoint in _candidates():
+        if not endpoint or endpoint in tried:
+            continue
+        tried.add(endpoint)
 
-    for endpoint in endpoints:
         try:
-            with etcd3.client(host=endpoint,
+            with _etcd_client(endpoint,
                               ca_cert=ca_cert,
                               cert_key=cert_key,
-                              cert_cert=cert_cert,
-                              timeout=TIMEOUT) as etcd:
-                etcd.status()
-        except etcd3.exceptions.ConnectionFailedError:
+                              cert_cert=cert_cert) as etcd:
+                members = list(etcd.members)
+        except (etcd3.exceptions.ConnectionFailedError,
+                etcd3.exceptions.ConnectionTimeoutError):
             pass
         else:
+            last_good_endpoints[certs] = endpoint
+            _update_members_cache(members)
             return endpoint
 
     raise Exception('Unable to find an available etcd member in the cluster')
 
 
+def _get_minion_endpoint(minion_id):
+    """Return the client endpoint of the etcd member running on a minion."""
+    endpoint = _get_member_endpoints().get(minion_id)
+    if endpoint is None:
+        # Not a (started) member yet, ask the mine
+        endpoint = __salt__['saltutil.runner'](
+            'mine.get', tgt=minion_id, fun='control_plane_ip'
+        )[minion_id]
+    return endpoint
+
+
 def add_etcd_node(
         peer_urls,
         endpoint=None,
@@ -78,18 +285,17 @@ def add_etcd_node(
                         IP is expected, not URL
     '''
     if not endpoint:
-        # If we have no endpoint get it from mine
+        # If we have no endpoint, pick an answering member
         endpoint = _get_endpoint_up(
             ca_cert=ca_cert,
             cert_key=cert_key,
             cert_cert=cert_cert
         )
 
-    with etcd3.client(host=endpoint,
+    with _etcd_client(endpoint,
                       ca_cert=ca_cert,
                       cert_key=cert_key,
-                      cert_cert=cert_cert,
-                      timeout=TIMEOUT) as etcd:
+                      cert_cert=cert_cert) as etcd:
         node = etcd.add_member(peer_urls)
 
     return node
@@ -103,18 +309,17 @@ def urls_exist_in_cluster(
         cert_cert='/etc/kubernetes/pki/etcd/salt-master-etcd-client.crt'):
     '''Verify if peer_urls exists in cluster.'''
     if not endpoint:
-        # If we have no endpoint get it from mine
+        # If we have no endpoint, pick an answering member
         endpoint = _get_endpoint_up(
             ca_cert=ca_cert,
             cert_key=cert_key,
             cert_cert=cert_cert
         )
 
-    with etcd3.client(host=endpoint,
+    with _etcd_client(endpoint,
                       ca_cert=ca_cert,
                       cert_key=cert_key,
-                      cert_cert=cert_cert,
-                      timeout=TIMEOUT) as etcd:
+                      cert_cert=cert_cert) as etcd:
         all_urls = []
         for member in etcd.members:
             all_urls.extend(member.peer_urls)
@@ -122,23 +327,66 @@ def urls_exist_in_cluster(
     return set(peer_urls).issubset(all_urls)
 
 
-def check_etcd_health(
+def _probe_member(member, ca_cert, cert_key, cert_cert):
+    """Retrieve the status of an etcd member, and the time it took."""
+    result = {
+        'id': member.id,
+        'client_urls': list(member.client_urls),
+        'healthy': False,
+    }
+
+    if not member.client_urls:
+        result['error'] = 'member is not started'
+        return result
+
+    etcd_url = urlparse(member.client_urls[0])
+    start = time.time()
+    try:
+        with _etcd_client(etcd_url.hostname,
+                          port=etcd_url.port,
+                          ca_cert=ca_cert,
+                          cert_key=cert_key,
+                          cert_cert=cert_cert) as etcd:
+            status = etcd.status()
+    except Exception as exc:  # pylint: disable=broad-except
+        log.debug(
+            "failed to check the health of member %s: %s", member.name, exc
+        )
+        result['error'] = str(exc) or type(exc).__name__
+    else:
+        result.update({
+            'healthy': True,
+            'version': status.version,
+            'db_size': status.db_size,
+            'leader': status.leader.name if status.leader else None,
+            'raft_index': status.raft_index,
+            'raft_term': status.raft_term,
+        })
+    result['latency'] = round(time.time() - start, 6)
+
+    return result
+
+
+def get_health_report(
         minion_id=None,
         ca_cert='/etc/kubernetes/pki/etcd/ca.crt',
         cert_key='/etc/kubernetes/pki/etcd/salt-master-etcd-client.key',
         cert_cert='/etc/kubernetes/pki/etcd/salt-master-etcd-client.crt'):
-    '''Check cluster-health of the `etcd` cluster.
+    '''Probe all members of the `etcd` cluster, concurrently.
 
     This module is only runnable from the salt-master on the bootstrap node.
 
+    Returns a dict with the cluster `status` ("healthy", "degraded" or
+    "unavailable"), the `leader` name, and the status of each member by name
+    (health, version, DB size, leader, raft index and term, and probe
+    latency in seconds).
+
     Arguments:
         minion_id (str): minion id of an etcd node
     '''
     # Get host ip from the minion id
     if minion_id:
-        endpoint = __salt__['saltutil.runner'](
-            'mine.get', tgt=minion_id, fun='control_plane_ip'
-        )[minion_id]
+        endpoint = _get_minion_endpoint(minion_id)
     else:
         endpoint = _get_endpoint_up(
             ca_cert=ca_cert,
@@ -146,35 +394,86 @@ def check_etcd_health(
             cert_cert=cert_cert
         )
     # Get all members
-    with etcd3.client(host=endpoint,
+    with _etcd_client(endpoint,
                       ca_cert=ca_cert,
                       cert_key=cert_key,
-                      cert_cert=cert_cert,
-                      timeout=TIMEOUT) as etcd:
+                      cert_cert=cert_cert) as etcd:
         etcd_members = list(etcd.members)
+    _update_members_cache(etcd_members)
+
+    # Probe members concurrently, so that a dead member does not delay the
+    # others by a full TIMEOUT
+    pool = ThreadPool(max(1, len(etcd_members)))
+    try:
+        probes = pool.map(
+            functools.partial(
+                _probe_member,
+                ca_cert=ca_cert,
+                cert_key=cert_key,
+                cert_cert=cert_cert
+            ),
+            etcd_members
+        )
+    finally:
+        pool.close()
+        pool.join()
 
-    unhealthy_member = 0
-    for member in etcd_members:
-        etcd_url = urlparse(member.client_urls[0])
-        try:
-            with etcd3.client(host=etcd_url.hostname,
-                              port=etcd_url.port,
-                              ca_cert=ca_cert,
-                              cert_key=cert_key,
-                              cert_cert=cert_cert,
-                              timeout=TIMEOUT) as etcd:
-                etcd.status()
-        except Exception:  # pylint: disable=broad-except
-            log.debug(
-                "failed to check the health of member %s", member.name
-            )
-            unhealthy_member += 1
+    members = {}
+    for member, probe in zip(etcd_members, probes):
+        members[member.name or str(member.id)] = probe
 
-    # Raise on error as this function will be called by module.run in sls file
+    unhealthy_member = sum(1 for probe in probes if not probe['healthy'])
     if unhealthy_member == len(etcd_members):
-        raise CommandExecutionError("cluster is unavailable")
+        status = 'unavailable'
     elif unhealthy_member > 0:
-        raise CommandExecutionError("cluster is degraded")
+        status = 'degraded'
+    else:
+        status = 'healthy'
+
+    leaders = set(
+        probe['leader'] for probe in probes
+        if probe['healthy'] and probe['leader']
+    )
+
+    return {
+        'status': status,
+        'leader': leaders.pop() if len(leaders) == 1 else None,
+        'members': members,
+    }
+
+
+def check_etcd_health(
+        minion_id=None,
+        ca_cert='/etc/kubernetes/pki/etcd/ca.crt',
+        cert_key='/etc/kubernetes/pki/etcd/salt-master-etcd-client.key',
+        cert_cert='/etc/kubernetes/pki/etcd/salt-master-etcd-client.crt'):
+    '''Check cluster-health of the `etcd` cluster.
+
+    This module is only runnable from the salt-master on the bootstrap node.
+    See `get_health_report` for details about each member.
+
+    Arguments:
+        minion_id (str): minion id of an etcd node
+    '''
+    report = get_health_report(
+        minion_id=minion_id,
+        ca_cert=ca_cert,
+        cert_key=cert_key,
+        cert_cert=cert_cert
+    )
+
+    for name, member in report['members'].items():
+        log.info(
+            "etcd member %s: healthy=%s, latency=%ss, db_size=%s, "
+            "raft_index=%s", name, member['healthy'], member.get('latency'),
+            member.get('db_size'), member.get('raft_index')
+        )
+
+    # Raise on error as this function will be called by module.run in sls file
+    if report['status'] != 'healthy':
+        raise CommandExecutionError(
+            "cluster is {}".format(report['status'])
+        )
     else:
         return "cluster is healthy"
 
@@ -185,9 +484,14 @@ def get_etcd_member_list(
         ca_cert='/etc/kubernetes/pki/etcd/ca.crt',
         cert_key='/etc/kubernetes/pki/etcd/salt-master-etcd-client.key',
         cert_cert='/etc/kubernetes/pki/etcd/salt-master-etcd-client.crt'):
-    '''Get the list of etcd members using the python etcd3 client.'''
+    '''Get the list of etcd members using the python etcd3 client.
+
+    If no `endpoint` is given, an answering member is picked (see
+    `_get_endpoint_up`, `nodes` only restricting etcd minions looked up in
+    the mine when no member is known yet).
+    '''
     if not endpoint:
-        # If we have no endpoint get it from mine
+        # If we have no endpoint, pick an answering member
         try:
             endpoint = _get_endpoint_up(
                 nodes=nodes,
@@ -198,16 +502,276 @@ def get_etcd_member_list(
         except:
             return []
 
-    with etcd3.client(host=endpoint,
+    with _etcd_client(endpoint,
                       ca_cert=ca_cert,
                       cert_key=cert_key,
-                      cert_cert=cert_cert,
-                      timeout=TIMEOUT) as etcd:
-        return [
-            {
-                'id': member.id,
-                'name': member.name,
-                'peer_urls': list(member.peer_urls),
-                'client_urls': list(member.client_urls)
-            } for member in etcd.members
-        ]
+                      cert_cert=cert_cert) as etcd:
+        members = list(etcd.members)
+    _update_members_cache(members)
+
+    return [
+        {
+            'id': member.id,
+            'name': member.name,
+            'peer_urls': list(member.peer_urls),
+            'client_urls': list(member.client_urls)
+        } for member in members
+    ]
+
+
+def _raw_status(etcd):
+    """Retrieve the raw status of the member an etcd client is connected to.
+
+    Unlike `etcd.status()`, this gives access to the response header (hence
+    the current revision), and does not list members.
+    """
+    try:
+        return etcd.maintenancestub.Status(
+            etcdrpc.StatusRequest(),
+            etcd.timeout,
+            credentials=etcd.call_credentials,
+            metadata=etcd.metadata
+        )
+    except grpc.RpcError as exc:
+        raise CommandExecutionError(
+            'Unable to get etcd member status: {}'.format(exc)
+        )
+
+
+def defragment(
+        retained_revisions=RETAINED_REVISIONS,
+        ca_cert='/etc/kubernetes/pki/etcd/ca.crt',
+        cert_key='/etc/kubernetes/pki/etcd/salt-master-etcd-client.key',
+        cert_cert='/etc/kubernetes/pki/etcd/salt-master-etcd-client.crt'):
+    '''Compact the `etcd` keyspace and defragment all members.
+
+    The keyspace is compacted up to the current revision minus
+    `retained_revisions`, then members are defragmented one at a time, the
+    leader last, checking the cluster health before each step.
+
+    This module is only runnable from the salt-master on the bootstrap node.
+
+    Returns a dict with the compaction revision, and for each member its
+    DB size before and after defragmentation, the space reclaimed (in bytes)
+    and the time taken (in seconds).
+
+    Arguments:
+        retained_revisions (int): number of revisions to keep when compacting
+    '''
+    certs = {'ca_cert': ca_cert, 'cert_key': cert_key, 'cert_cert': cert_cert}
+
+    report = get_health_report(**certs)
+    if report['status'] != 'healthy':
+        raise CommandExecutionError(
+            'Cannot defragment etcd, cluster is {}'.format(report['status'])
+        )
+
+    endpoint = _get_endpoint_up(**certs)
+    with _etcd_client(endpoint, **certs) as etcd:
+        revision = _raw_status(etcd).header.revision
+        compact_revision = revision - int(retained_revisions)
+        if compact_revision > 0:
+            try:
+                etcd.compact(compact_revision, physical=True)
+            except grpc.RpcError as exc:
+                if exc.code() != grpc.StatusCode.OUT_OF_RANGE:
+                    raise CommandExecutionError(
+                        'Unable to compact etcd: {}'.format(exc)
+                    )
+                # Already compacted up to (or after) this revision
+                log.debug('etcd already compacted: %s', exc)
+        else:
+            compact_revision = None
+
+    # Defragment the leader last, since it blocks the member during the
+    # operation and a leader election would slow the whole cluster down
+    names = sorted(
+        report['members'],
+        key=lambda name: (name == report['leader'], name)
+    )
+
+    result = {
+        'revision': revision,
+        'compact_revision': compact_revision,
+        'members': {},
+        'reclaimed': 0,
+    }
+
+    for index, name in enumerate(names):
+        if index > 0:
+            report = get_health_report(**certs)
+            if report['status'] != 'healthy':
+                raise CommandExecutionError(
+                    'Stopped defragmenting etcd before member {}, cluster is '
+                    '{}'.format(name, report['status']),
+                    result
+                )
+
+        etcd_url = urlparse(report['members'][name]['client_urls'][0])
+        start = time.time()
+        try:
+            # Not pooled, as it needs a longer timeout
+            with etcd3.client(host=etcd_url.hostname,
+                              port=etcd_url.port,
+                              timeout=DEFRAG_TIMEOUT,
+                              **certs) as etcd:
+                db_size_before = _raw_status(etcd).dbSize
+                etcd.defragment()
+                db_size_after = _raw_status(etcd).dbSize
+        except (etcd3.exceptions.Etcd3Exception, grpc.RpcError) as exc:
+            raise CommandExecutionError(
+                'Unable to defragment etcd member {}: {}'.format(
+                    name, str(exc) or type(exc).__name__
+                ),
+                result
+            )
+
+        member_result = {
+            'db_size_before': db_size_before,
+            'db_size_after': db_size_after,
+            'reclaimed': max(0, db_size_before - db_size_after),
+            'duration': round(time.time() - start, 3),
+        }
+        log.info('Defragmented etcd member %s: %s', name, member_result)
+
+        result['members'][name] = member_result
+        result['reclaimed'] += member_result['reclaimed']
+
+    return result
+
+
+class _HashingFile(object):
+    """File wrapper computing the SHA256 and size of written data."""
+    def __init__(self, fd):
+        self._fd = fd
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        self._fd.write(data)
+
+    def flush(self):
+        self._fd.flush()
+
+
+class _ChunkedWriter(object):
+    """File wrapper buffering writes into fixed-size chunks."""
+    def __init__(self, fd, chunk_size):
+        self._fd = fd
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        self._buffer.extend(data)
+        while len(self._buffer) >= self._chunk_size:
+            self._fd.write(bytes(self._buffer[:self._chunk_size]))
+            del self._buffer[:self._chunk_size]
+
+    def flush(self):
+        if self._buffer:
+            self._fd.write(bytes(self._buffer))
+            del self._buffer[:]
+
+
+def snapshot(
+        dest,
+        endpoint=None,
+        compress=False,
+        chunk_size=SNAPSHOT_CHUNK_SIZE,
+        fsync=True,
+        timeout=SNAPSHOT_TIMEOUT,
+        ca_cert='/etc/kubernetes/pki/etcd/ca.crt',
+        cert_key='/etc/kubernetes/pki/etcd/salt-master-etcd-client.key',
+        cert_cert='/etc/kubernetes/pki/etcd/salt-master-etcd-client.crt'):
+    '''Save a snapshot of the `etcd` database to a file.
+
+    The snapshot is streamed to disk in `chunk_size` chunks, so it is never
+    held in memory, and written to a temporary file renamed to `dest` once
+    complete (and synced to disk, if `fsync`).
+
+    Returns a dict with the file path, its size and SHA256 (of the file
+    written, so compressed if `compress`), the snapshot size, and the
+    time taken and throughput (in bytes per second, of the snapshot).
+
+    Arguments:
+        dest (str): path of the snapshot file
+        endpoint (str): host server in the etcd cluster
+                        IP is expected, not URL
+        compress (bool): compress the snapshot with gzip
+        chunk_size (int): size (in bytes) of chunks written to disk
+        fsync (bool): sync the snapshot file to disk before renaming it
+        timeout (int): maximum time (in seconds) to retrieve the snapshot
+    '''
+    if not endpoint:
+        # If we have no endpoint, pick an answering member
+        endpoint = _get_endpoint_up(
+            ca_cert=ca_cert,
+            cert_key=cert_key,
+            cert_cert=cert_cert
+        )
+
+    tmp_dest = '{}.part'.format(dest)
+    start = time.time()
+    try:
+        with open(tmp_dest, 'wb') as fd:
+            hashing_fd = _HashingFile(fd)
+            if compress:
+                out_fd = gzip.GzipFile(
+                    filename=os.path.basename(dest), mode='wb',
+                    fileobj=hashing_fd
+                )
+            else:
+                out_fd = hashing_fd
+            writer = _ChunkedWriter(out_fd, int(chunk_size))
+
+            # Not pooled, as it needs a longer timeout
+            with etcd3.client(host=endpoint,
+                              ca_cert=ca_cert,
+                              cert_key=cert_key,
+                              cert_cert=cert_cert,
+                              timeout=timeout) as etcd:
+                etcd.snapshot(writer)
+
+            writer.flush()
+            if compress:
+                out_fd.close()
+            fd.flush()
+            if fsync:
+                os.fsync(fd.fileno())
+    except (etcd3.exceptions.Etcd3Exception, grpc.RpcError,
+            IOError, OSError) as exc:
+        try:
+            os.remove(tmp_dest)
+        except OSError:
+            pass
+        raise CommandExecutionError(
+            'Unable to save etcd snapshot to {}: {}'.format(
+                dest, str(exc) or type(exc).__name__
+            )
+        )
+
+    os.rename(tmp_dest, dest)
+    if fsync:
+        dir_fd = os.open(os.path.dirname(os.path.abspath(dest)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    duration = time.time() - start
+    result = {
+        'path': dest,
+        'endpoint': endpoint,
+        'snapshot_size': writer.size,
+        'size': hashing_fd.size,
+        'sha256': hashing_fd.sha256.hexdigest(),
+        'duration': round(duration, 3),
+        'throughput': int(writer.size / duration) if duration else None,
+    }
+    log.info('Saved etcd snapshot: %s', result)
+
+    return result
@@ -9,6 +9,9 @@ module, while other methods can be found in `metalk8s_kubernetes_utils.py`,
 `metalk8s_drain.py` and `metalk8s_cordon.py`.
 """
 
+import copy
+import hashlib
+import json
 import logging
 import re
 
@@ -32,6 +35,10 @@ log = logging.getLogger(__name__)
 
 __virtualname__ = 'metalk8s_kubernetes'
 
+# Annotation recording the digest of the manifest an object was last written
+# from, so that fields removed from a manifest are detected as changes
+MANIFEST_DIGEST_ANNOTATION = 'metalk8s.scality.com/manifest-digest'
+
 
 def __virtual__():
     if MISSING_DEPS:
@@ -56,6 +63,59 @@ def _extract_obj_and_kind_info(manifest, force_custom_object=False):
     return obj, kind_info
 
 
+def _add_version_label(manifest, saltenv):
+    """Add label containing metalk8s version (retrieved from saltenv)."""
+    match = re.search(r'^metalk8s-(?P<version>.+)$', saltenv)
+    manifest.setdefault('metadata', {}).setdefault('labels', {})[
+        'metalk8s.scality.com/version'
+    ] = match.group('version') if match else "unknown"
+
+
+def _add_manifest_digest(manifest):
+    """Add annotation containing the digest of the manifest itself."""
+    metadata = manifest.setdefault('metadata', {})
+    annotations = metadata.get('annotations') or {}
+    annotations.pop(MANIFEST_DIGEST_ANNOTATION, None)
+    metadata['annotations'] = annotations
+
+    digest = hashlib.sha256(
+        json.dumps(manifest, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()
+    annotations[MANIFEST_DIGEST_ANNOTATION] = digest
+
+
+def _get_object_cache(apiVersion, kind, kubeconfig, context):
+    """Return the local object cache for a kind, or `None` if not enabled.
+
+    Caches are enabled per kind through the `metalk8s.object_cache` option,
+    usually set in the salt-master configuration, e.g.:
+
+    .. code-block:: yaml
+
+        metalk8s.object_cache:
+          kinds:
+            - v1/Node
+            - storage.metalk8s.scality.com/v1alpha1/Volume
+          max_staleness: 30
+    """
+    config = __salt__['config.option']('metalk8s.object_cache', {}) or {}
+    if '{}/{}'.format(apiVersion, kind) not in config.get('kinds', []):
+        return None
+
+    try:
+        return __utils__['metalk8s_kubernetes.get_object_cache'](
+            apiVersion, kind,
+            config_file=kubeconfig,
+            context=context,
+            max_staleness=config.get('max_staleness', 30),
+        )
+    except ValueError as exc:
+        log.warning(
+            'Cannot use a local cache for "%s/%s": %s', apiVersion, kind, exc
+        )
+        return None
+
+
 def _handle_error(exception, action):
     """Wrap an exception raised during a call to the K8s API.
 
@@ -79,7 +139,8 @@ def _object_manipulation_function(action):
 
     def method(manifest=None, name=None, kind=None, apiVersion=None,
                namespace='default', patch=None, old_object=None,
-               template='jinja', defaults=None, saltenv='base', **kwargs):
+               template='jinja', defaults=None, saltenv='base',
+               request_timeout=None, **kwargs):
         if manifest is None:
             if action in ['retrieve', 'delete', 'update'] and \
                     name and kind and apiVersion and \
@@ -133,12 +194,9 @@ def _object_manipulation_function(action):
                 )
             )
 
-        # Adding label containing metalk8s version (retrieved from saltenv)
         if action in ['create', 'replace']:
-            match = re.search(r'^metalk8s-(?P<version>.+)$', saltenv)
-            manifest.setdefault('metadata', {}).setdefault('labels', {})[
-                'metalk8s.scality.com/version'
-            ] = match.group('version') if match else "unknown"
+            _add_version_label(manifest, saltenv)
+            _add_manifest_digest(manifest)
 
         log.debug(
             '%sing object with manifest: %s',
@@ -177,6 +235,8 @@ def _object_manipulation_function(action):
                 call_kwargs['body']['metadata'].pop('namespace', None)
         elif action != 'retrieve':
             call_kwargs['body'] = obj
+        if request_timeout is not None:
+            call_kwargs['_request_timeout'] = request_timeout
 
         if action == 'replace' and old_object:
             # Some attributes have to be preserved
@@ -195,6 +255,20 @@ def _object_manipulation_function(action):
             'metalk8s_kubernetes.get_kubeconfig'
         ](**kwargs)
 
+        cache = None
+        if action in ['create', 'retrieve', 'replace', 'update', 'delete']:
+            cache = _get_object_cache(
+                manifest['apiVersion'], manifest['kind'], kubeconfig, context
+            )
+
+        if action == 'retrieve' and cache is not None:
+            found, result = cache.get(
+                call_kwargs.get('namespace'), call_kwargs['name']
+            )
+            if found:
+                log.debug("Retrieved '%s' from local cache", call_kwargs)
+                return result
+
         client = kind_info.client
         client.configure(config_file=kubeconfig, context=context)
         method_func = getattr(client, action)
@@ -205,16 +279,36 @@ def _object_manipulation_function(action):
             result = method_func(**call_kwargs)
         except (ApiException, HTTPError) as exc:
             return _handle_error(exc, action)
+        finally:
+            if cache is not None and action == 'delete':
+                # Read the object from the API until the cache is notified
+                cache.invalidate(
+                    call_kwargs.get('namespace'), call_kwargs['name']
+                )
+
+        if action != 'retrieve':
+            __utils__['metalk8s_kubernetes.record_write'](
+                __opts__['cachedir']
+            )
 
         # NOTE: result is always either a standard `kubernetes.client` model,
         # or a `CustomObject` as defined in the __utils__ module.
-        return result.to_dict()
+        result = result.to_dict()
+
+        if cache is not None and action not in ['retrieve', 'delete']:
+            # Write-through, so that a following read does not need to wait
+            # for the watch event
+            cache.store(result)
+
+        return result
 
     base_doc = """
     {verb} an object from its manifest.
 
     A manifest should be passed in standard Kubernetes format as a dictionary,
-    or through a filepath.""".format(verb=action.capitalize())
+    or through a filepath.
+    The API call can be bounded with `request_timeout` (in seconds)."""
+    base_doc = base_doc.format(verb=action.capitalize())
 
     if action in ['create', 'replace']:
         method.__doc__ = """{base_doc}
@@ -296,12 +390,78 @@ get_object = _object_manipulation_function('retrieve')
 update_object = _object_manipulation_function('update')
 
 
+def diff_object(old_object, manifest=None, name=None, template='jinja',
+                defaults=None, saltenv='base'):
+    """
+    List the fields of a manifest which differ from an existing object.
+
+    The manifest is compared as it would be sent by `replace_object`, so only
+    fields set in the manifest are considered: defaults and fields populated by
+    the API server (status, resourceVersion, managedFields...) are ignored.
+    Fields removed from the manifest are detected through the digest of the
+    manifest the object was last written from (see
+    `MANIFEST_DIGEST_ANNOTATION`), objects written without it always differ.
+    An empty list means that replacing the object would be a no-op.
+
+    CLI Examples:
+
+    .. code-block:: bash
+
+        salt-call metalk8s_kubernetes.diff_object old_object="$(salt-call --out=json metalk8s_kubernetes.get_object ...)" name=/root/object.yaml
+    """
+    if manifest is None:
+        if not name:
+            raise CommandExecutionError(
+                'Must provide one of "manifest" or "name" (path to a file) '
+                'to compare object.'
+            )
+        try:
+            manifest = __salt__[
+                'metalk8s_kubernetes.read_and_render_yaml_file'
+            ](
+                source=name,
+                template=template,
+                context=defaults,
+                saltenv=saltenv
+            )
+        except IOError as exc:
+            raise CommandExecutionError(
+                'Failed to read file "{}": {}'.format(name, str(exc))
+            )
+        except yaml.YAMLError as exc:
+            raise CommandExecutionError(
+                'Invalid YAML in file "{}": {}'.format(name, str(exc))
+            )
+    else:
+        manifest = copy.deepcopy(manifest)
+
+    _add_version_label(manifest, saltenv)
+    _add_manifest_digest(manifest)
+
+    try:
+        return __utils__['metalk8s_kubernetes.get_diff_paths'](
+            manifest, old_object
+        )
+    except ValueError as exc:
+        raise CommandExecutionError('Invalid manifest: {!s}'.format(exc))
+
+
+# Number of objects retrieved per request when listing objects
+LIST_PAGE_SIZE = 500
+
+
 # Listing resources can benefit from a simpler signature
 def list_objects(kind, apiVersion, namespace='default', all_namespaces=False,
-                 field_selector=None, **kwargs):
+                 field_selector=None, label_selector=None,
+                 limit=LIST_PAGE_SIZE, **kwargs):
     """
     List all objects of a type using some object description.
 
+    Objects are retrieved by pages of `limit` objects (except for custom
+    objects, which are retrieved at once), or from the local object cache if
+    enabled for this kind (see `metalk8s.object_cache`) and no
+    `field_selector` is used.
+
     CLI Examples:
 
     .. code-block:: bash
@@ -309,6 +469,36 @@ def list_objects(kind, apiVersion, namespace='default', all_namespaces=False,
         salt-call metalk8s_kubernetes.list_objects kind="Pod" apiVersion="v1"
         salt-call metalk8s_kubernetes.list_objects kind="Pod" apiVersion="v1" namespace="kube-system"
         salt-call metalk8s_kubernetes.list_objects kind="Pod" apiVersion="v1" all_namespaces=True field_selector="spec.nodeName=bootstrap"
+        salt-call metalk8s_kubernetes.list_objects kind="Pod" apiVersion="v1" all_namespaces=True label_selector="app=nginx"
+    """
+    return list(iter_objects(
+        kind, apiVersion,
+        namespace=namespace,
+        all_namespaces=all_namespaces,
+        field_selector=field_selector,
+        label_selector=label_selector,
+        limit=limit,
+        **kwargs
+    ))
+
+
+# Number of times a paginated list is restarted when its continue token
+# expired (410 Gone)
+LIST_MAX_RESTARTS = 3
+
+
+def iter_objects(kind, apiVersion, namespace='default', all_namespaces=False,
+                 field_selector=None, label_selector=None,
+                 limit=LIST_PAGE_SIZE, stats=None, **kwargs):
+    """
+    Iterate over all objects of a type using some object description.
+
+    This is the generator used by `list_objects`, meant to be used from other
+    modules to process objects page by page, so that at most `limit` objects
+    are held in memory at once.
+
+    Arguments are validated when called, not when iterating. If a `stats`
+    dict is given, its `pages` counter is incremented for each API request.
     """
     try:
         kind_info = __utils__['metalk8s_kubernetes.get_kind_info']({
@@ -329,20 +519,69 @@ def list_objects(kind, apiVersion, namespace='default', all_namespaces=False,
         call_kwargs['namespace'] = namespace
     if field_selector:
         call_kwargs['field_selector'] = field_selector
+    if label_selector:
+        call_kwargs['label_selector'] = label_selector
+    # NOTE: only standard kinds (with a model) support pagination
+    paginate = bool(limit) and hasattr(kind_info, 'model')
+    if paginate:
+        call_kwargs['limit'] = int(limit)
 
     kubeconfig, context = __salt__[
         'metalk8s_kubernetes.get_kubeconfig'
     ](**kwargs)
 
+    cache = None
+    if not field_selector:
+        cache = _get_object_cache(apiVersion, kind, kubeconfig, context)
+    if cache is not None:
+        objects = cache.list(
+            namespace=call_kwargs.get('namespace'),
+            label_selector=label_selector,
+        )
+        if objects is not None:
+            return iter(objects)
+
     client = kind_info.client
     client.configure(config_file=kubeconfig, context=context)
 
-    try:
-        result = client.list(**call_kwargs)
-    except (ApiException, HTTPError) as exc:
-        base_msg = 'Failed to list resources "{}/{}"'.format(apiVersion, kind)
-        if 'namespace' in call_kwargs:
-            base_msg += ' in namespace "{}"'.format(namespace)
-        raise CommandExecutionError('{}: {!s}'.format(base_msg, exc))
-
-    return [obj.to_dict() for obj in result.items]
+    base_msg = 'Failed to list resources "{}/{}"'.format(apiVersion, kind)
+    if 'namespace' in call_kwargs:
+        base_msg += ' in namespace "{}"'.format(namespace)
+
+    return _iter_pages(client, call_kwargs, paginate, base_msg, stats)
+
+
+def _iter_pages(client, call_kwargs, paginate, base_msg, stats):
+    # UIDs of the objects already yielded, in case the list gets restarted
+    seen = set()
+    restarts = 0
+
+    while True:
+        if stats is not None:
+            stats['pages'] = stats.get('pages', 0) + 1
+        try:
+            result = client.list(**call_kwargs)
+        except (ApiException, HTTPError) as exc:
+            if isinstance(exc, ApiException) and exc.status == 410 and \
+                    '_continue' in call_kwargs and \
+                    restarts < LIST_MAX_RESTARTS:
+                # The continue token expired, list again from the start
+                log.debug('%s: continue token expired, restarting', base_msg)
+                restarts += 1
+                del call_kwargs['_continue']
+                continue
+            raise CommandExecutionError('{}: {!s}'.format(base_msg, exc))
+
+        for obj in result.items:
+            obj = obj.to_dict()
+            if paginate:
+                uid = obj['metadata'].get('uid')
+                if uid in seen:
+                    continue
+                seen.add(uid)
+            yield obj
+
+        continue_token = getattr(result.metadata, '_continue', None)
+        if not paginate or not continue_token:
+            break
+        call_kwargs['_continue'] = continue_token
@@ -86,7 +86,7 @@ def get_version_info(**kwargs):
     """
     kubeconfig, context = get_kubeconfig(**kwargs)
 
-    api_client = kubernetes.config.new_client_from_config(
+    api_client = __utils__['metalk8s_kubernetes.get_api_client'](
         config_file=kubeconfig, context=context
     )
 
@@ -117,6 +117,30 @@ def ping(**kwargs):
     return True
 
 
+def client_cache_stats():
+    """Retrieve the counters of the Kubernetes API client cache, as a dict.
+
+    Note that the cache lives in the current process, so this is mostly
+    useful for logging from other execution modules or orchestrates.
+
+    CLI Example:
+        salt-run salt.cmd metalk8s_kubernetes.client_cache_stats
+    """
+    return __utils__['metalk8s_kubernetes.get_client_cache_stats']()
+
+
+def object_cache_stats():
+    """Retrieve the counters of the local object caches, keyed by kind.
+
+    Like `client_cache_stats`, caches live in the current process, see the
+    `metalk8s.object_cache` option to enable them.
+
+    CLI Example:
+        salt-run salt.cmd metalk8s_kubernetes.object_cache_stats
+    """
+    return __utils__['metalk8s_kubernetes.get_object_caches_stats']()
+
+
 def read_and_render_yaml_file(source, template, context=None, saltenv='base'):
     '''
     Read a yaml file and, if needed, renders that using the specifieds
@@ -158,6 +158,41 @@ def clean_up(name):
     _get_volume(name).clean_up()
 
 
+def probe_all():
+    """Probe the backing storage devices of all the volumes in one pass.
+
+    The result is kept for the rest of the run, and reused by the checks on
+    the volumes until their device is formatted or cleaned up. Sparse files
+    are also cached across runs, as long as they do not change.
+
+    Returns:
+        dict: the information about each probed volume, by volume name
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '<NODE_NAME>' metalk8s_volumes.probe_all
+    """
+    paths = {}
+    for name, volume in __pillar__['metalk8s']['volumes'].items():
+        try:
+            paths[name] = _make_volume(name, volume).path
+        except (KeyError, ValueError) as exn:
+            log.debug('cannot get the device of volume %s: %s', name, exn)
+
+    infos = __utils__['metalk8s_volumes.probe_devices'](
+        paths.values(), **_get_probe_config()
+    )
+    __context__['metalk8s_volumes.device_info'] = dict(infos)
+
+    return {
+        name: dict(infos[path]._asdict(), path=path)
+        for name, path in paths.items()
+        if path in infos
+    }
+
+
 # Volume {{{
 
 
@@ -209,7 +244,7 @@ class Volume(object):
     def is_formatted(self):
         """Check if the volume is already formatted by us."""
         uuid = self.get('metadata.uid').lower()
-        return _get_from_blkid(self.path).uuid == uuid
+        return _get_device_info(self.path).uuid == uuid
 
     def format(self, force=False):
         """Format the volume.
@@ -218,6 +253,7 @@ class Volume(object):
         """
         # Check that the backing device is not already formatted.
         # Bail out if it is: we don't want data loss because of a typo…
+        # (never trust a cached probe for this)
         device_info = _get_from_blkid(self.path)
         if device_info.fstype:
             raise Exception(
@@ -237,7 +273,10 @@ class Volume(object):
         command = _mkfs(
             self.path, fs_type, self.get('metadata.uid'), force, options
         )
-        _run_cmd(' '.join(command))
+        try:
+            _run_cmd(' '.join(command))
+        finally:
+            _invalidate_device_info(self.path)
 
     def get(self, path):
         """Return the Volume attribute `path` from the Volume dict."""
@@ -315,6 +354,8 @@ class SparseLoopDevice(Volume):
             if exn.errno != errno.ENOENT:
                 raise
             log.warning('{} already removed'.format(exn.filename))
+        finally:
+            _invalidate_device_info(self.path)
 
 
 # }}}
@@ -365,6 +406,10 @@ def _get_volume(name):
     volume = __pillar__['metalk8s']['volumes'].get(name)
     if volume is None:
         raise ValueError('volume {} not found in pillar'.format(name))
+    return _make_volume(name, volume)
+
+
+def _make_volume(name, volume):
     if 'rawBlockDevice' in volume['spec']:
         return RawBlockDevice(volume)
     elif 'sparseLoopDevice' in volume['spec']:
@@ -451,16 +496,44 @@ def _open_fd(*args, **kwargs):
 #     returns "devtmpfs       devtmpfs   1932084     0   1932084   0% /dev"
 #
 # So yeah, let's not rely on this…
-def _get_from_blkid(path):
+def _get_probe_config():
     flags = __utils__['metalk8s_volumes.get_superblock_flags']('UUID', 'TYPE')
-    kwargs = {
+    return {
         'use_superblocks': True, 'superblocks_flags': flags,
         'use_partitions': True,
     }
-    with __utils__['metalk8s_volumes.get_blkid_probe'](path, **kwargs) as probe:
+
+
+def _get_from_blkid(path):
+    with __utils__['metalk8s_volumes.get_blkid_probe'](
+        path, **_get_probe_config()
+    ) as probe:
         return probe.probe()
 
 
+def _get_device_info(path):
+    """Get the DeviceInfo of a device, probing it at most once per run.
+
+    The first call of a run probes the devices of all the volumes in the
+    pillar in one pass, so that the following checks reuse the result.
+    """
+    if 'metalk8s_volumes.device_info' not in __context__:
+        probe_all()
+
+    device_info = __context__['metalk8s_volumes.device_info']
+    if path not in device_info:
+        device_info[path] = __utils__['metalk8s_volumes.probe_device'](
+            path, **_get_probe_config()
+        )
+    return device_info[path]
+
+
+def _invalidate_device_info(path):
+    """Forget what is known about a device, e.g. once it has been modified."""
+    __context__.get('metalk8s_volumes.device_info', {}).pop(path, None)
+    __utils__['metalk8s_volumes.invalidate_device_info'](path)
+
+
 def _mkfs(path, fs_type, uuid, force=False, options=None):
     """Build the command line required to format `path` as specified.
 
@@ -6,6 +6,8 @@ import salt.utils.yaml
 
 log = logging.getLogger(__name__)
 
+__virtualname__ = 'metalk8s'
+
 
 DEFAULT_POD_NETWORK = '10.233.0.0/16'
 DEFAULT_SERVICE_NETWORK = '10.96.0.0/12'
@@ -89,7 +91,7 @@ def _load_iso_path(config_data):
     return res
 
 
-def ext_pillar(minion_id, pillar, bootstrap_config):
+def _ext_pillar(minion_id, pillar, bootstrap_config):
     config = _load_config(bootstrap_config)
     if config.get('_errors'):
         metal_data = __utils__['pillar_utils.errors_to_dict'](
@@ -117,3 +119,9 @@ def ext_pillar(minion_id, pillar, bootstrap_config):
         __utils__['pillar_utils.promote_errors'](result, key)
 
     return result
+
+
+def ext_pillar(minion_id, pillar, bootstrap_config):
+    return __utils__['pillar_utils.timed'](_ext_pillar)(
+        minion_id, pillar, bootstrap_config
+    )
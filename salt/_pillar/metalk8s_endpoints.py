@@ -1,13 +1,26 @@
 """Store data about bootstrap services ip/port in pillar"""
 
 import logging
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
 import os.path
+import time
 
 
 log = logging.getLogger(__name__)
 
 __virtualname__ = 'metalk8s_endpoints'
 
+# Maximum age (in seconds) of the cached Endpoints, after which they are
+# retrieved from the API again
+CACHE_MAX_STALENESS = 60
+
+# Maximum time (in seconds) spent resolving endpoints for a minion
+RESOLVE_TIMEOUT = 10
+
+# Timeout (in seconds) of each call to the API
+REQUEST_TIMEOUT = 5
+
 
 def __virtual__():
     if 'metalk8s_kubernetes.get_object' not in __salt__:
@@ -16,16 +29,30 @@ def __virtual__():
         return __virtualname__
 
 
-def service_endpoints(service, namespace, kubeconfig):
+def _get_endpoints_cache(namespace, kubeconfig):
+    """Return the master-side cache of Endpoints in a namespace, if usable.
+
+    The cache (and its watch) is shared by all pillar computations of the
+    salt-master process.
+    """
+    if 'metalk8s_kubernetes.get_object_cache' not in __utils__:
+        return None
+
     try:
-        endpoint = __salt__['metalk8s_kubernetes.get_object'](
-            name=service,
-            kind='Endpoints',
-            apiVersion='v1',
+        return __utils__['metalk8s_kubernetes.get_object_cache'](
+            'v1', 'Endpoints',
+            config_file=kubeconfig,
             namespace=namespace,
-            kubeconfig=kubeconfig,
+            max_staleness=CACHE_MAX_STALENESS,
         )
+    except ValueError as exc:
+        log.warning('Cannot cache Endpoints: %s', exc)
+        return None
+
 
+def _endpoints_info(service, namespace, endpoint):
+    """Extract the pillar information from an Endpoints object."""
+    try:
         if not endpoint:
             return __utils__['pillar_utils.errors_to_dict']([
                 'Endpoint not found: {}'.format(service)
@@ -56,7 +83,94 @@ def service_endpoints(service, namespace, kubeconfig):
         return res
 
 
-def ext_pillar(minion_id, pillar, kubeconfig):
+def service_endpoints(service, namespace, kubeconfig):
+    try:
+        endpoint = __salt__['metalk8s_kubernetes.get_object'](
+            name=service,
+            kind='Endpoints',
+            apiVersion='v1',
+            namespace=namespace,
+            kubeconfig=kubeconfig,
+            request_timeout=REQUEST_TIMEOUT,
+        )
+    except Exception as exc:  # pylint: disable=broad-except
+        error_tplt = (
+            'Unable to get kubernetes endpoints'
+            ' for {} in namespace {}:\n{}'
+        )
+        return __utils__['pillar_utils.errors_to_dict']([
+            error_tplt.format(service, namespace, exc)
+        ])
+
+    return _endpoints_info(service, namespace, endpoint)
+
+
+def resolve_endpoints(services, kubeconfig, timeout=RESOLVE_TIMEOUT):
+    """Resolve endpoints of all services.
+
+    Endpoints are read from the master-side cache when it is fresh. Others
+    (e.g. on a cold start) are retrieved from the API concurrently, and
+    services not resolved within `timeout` seconds are reported as errors,
+    so that a slow API server does not block the pillar rendering.
+    """
+    endpoints = {}
+    requests = []
+    for namespace, names in services.items():
+        cache = _get_endpoints_cache(namespace, kubeconfig)
+        for service in names:
+            found, endpoint = False, None
+            if cache is not None:
+                found, endpoint = cache.get(namespace, service)
+            if found:
+                endpoints[service] = _endpoints_info(
+                    service, namespace, endpoint
+                )
+            else:
+                requests.append((namespace, service))
+
+    if requests:
+        endpoints.update(_fetch_endpoints(requests, kubeconfig, timeout))
+
+    for service in list(endpoints):
+        __utils__['pillar_utils.promote_errors'](endpoints, service)
+
+    return endpoints
+
+
+def _fetch_endpoints(requests, kubeconfig, timeout):
+    deadline = time.time() + timeout
+    pool = ThreadPool(len(requests))
+    try:
+        pending = [
+            (service, pool.apply_async(
+                service_endpoints, (service, namespace, kubeconfig)
+            ))
+            for namespace, service in requests
+        ]
+
+        endpoints = {}
+        for service, async_result in pending:
+            try:
+                endpoints[service] = async_result.get(
+                    max(0, deadline - time.time())
+                )
+            except TimeoutError:
+                endpoints[service] = __utils__[
+                    'pillar_utils.errors_to_dict'
+                ]([
+                    'Timed out after {}s getting kubernetes endpoints for {}'
+                    .format(timeout, service)
+                ])
+    finally:
+        # API calls are bounded by `REQUEST_TIMEOUT`, so workers still
+        # running finish shortly and no thread is left behind
+        pool.close()
+        pool.join()
+
+    return endpoints
+
+
+def _ext_pillar(minion_id, pillar, kubeconfig):
     services = {
         "kube-system": ['salt-master', 'repositories'],
     }
@@ -68,18 +182,7 @@ def ext_pillar(minion_id, pillar, kubeconfig):
         ])
 
     else:
-        endpoints = {}
-
-        for namespace, services in services.items():
-            for service in services:
-                endpoints.update(
-                    {
-                        service: service_endpoints(
-                            service, namespace, kubeconfig
-                        )
-                    }
-                )
-                __utils__['pillar_utils.promote_errors'](endpoints, service)
+        endpoints = resolve_endpoints(services, kubeconfig)
 
     result = {
         'metalk8s': {
@@ -90,3 +193,9 @@ def ext_pillar(minion_id, pillar, kubeconfig):
     __utils__['pillar_utils.promote_errors'](result['metalk8s'], 'endpoints')
 
     return result
+
+
+def ext_pillar(minion_id, pillar, kubeconfig):
+    return __utils__['pillar_utils.timed'](_ext_pillar)(
+        minion_id, pillar, kubeconfig
+    )
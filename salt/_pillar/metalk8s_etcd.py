@@ -29,5 +29,11 @@ def _load_members(pillar):
     return result
 
 
-def ext_pillar(minion_id, pillar):
+def _ext_pillar(minion_id, pillar):
     return {"metalk8s": {'etcd': _load_members(pillar)}}
+
+
+def ext_pillar(minion_id, pillar):
+    return __utils__['pillar_utils.timed'](_ext_pillar)(
+        minion_id, pillar
+    )
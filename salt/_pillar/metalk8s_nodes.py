@@ -1,11 +1,13 @@
+import copy
 import os.path
 import logging
 import datetime
+import threading
+import time
 
 try:
     import kubernetes.client
     from kubernetes.client.rest import ApiException
-    import kubernetes.config
     from urllib3.exceptions import HTTPError
     HAS_DEPS = True
 except ImportError:
@@ -14,6 +16,11 @@ except ImportError:
 
 VERSION_LABEL = 'metalk8s.scality.com/version'
 ROLE_LABEL_PREFIX = 'node-role.kubernetes.io/'
+VOLUME_NODE_LABEL = 'storage.metalk8s.scality.com/node'
+
+# Time (in seconds) during which a snapshot of the cluster is shared by all
+# minions pillar computations of a salt-master process
+SNAPSHOT_TTL = 10
 
 
 log = logging.getLogger(__name__)
@@ -77,44 +84,61 @@ def iso_timestamp_converter(timestamp):
     return timestamp.isoformat()
 
 
-def get_storage_classes(api_client):
+def get_storage_class(api_client, name):
     storageV1 = kubernetes.client.StorageV1Api(api_client=api_client)
-    storage_classes = {}
-    storageclass_list = storageV1.list_storage_class()
-    for storageclass in storageclass_list.items:
-        # Need to convert the datetime object in storageclass to ISO format in
-        # order to make them serializable.
-        storageclass.metadata.creation_timestamp = iso_timestamp_converter(
-            storageclass.metadata.creation_timestamp
-        )
-        storageclass.metadata.deletion_timestamp = iso_timestamp_converter(
-            storageclass.metadata.deletion_timestamp
-        )
-        storage_classes[storageclass.metadata.name] = storageclass.to_dict()
+    try:
+        storageclass = storageV1.read_storage_class(name=name)
+    except ApiException as exc:
+        if exc.status == 404:
+            return None
+        raise
+    # Need to convert the datetime object in storageclass to ISO format in
+    # order to make them serializable.
+    storageclass.metadata.creation_timestamp = iso_timestamp_converter(
+        storageclass.metadata.creation_timestamp
+    )
+    storageclass.metadata.deletion_timestamp = iso_timestamp_converter(
+        storageclass.metadata.deletion_timestamp
+    )
+    return storageclass.to_dict()
 
-    return storage_classes
 
+def list_node_volumes(api_client, minion_id):
+    """List the volumes of a node, using the label set by the storage-operator.
 
-def list_volumes(api_client, minion_id):
+    Volumes not labeled yet (i.e. not reconciled since the label was
+    introduced) are also listed, and filtered here.
+    """
     customObjectsApi = kubernetes.client.CustomObjectsApi(
         api_client=api_client
     )
-    try:
-        storage_classes = get_storage_classes(api_client)
-    except (ApiException, HTTPError) as exc:
-        error_tplt = (
-            'Exception while calling StorageV1->list_storage_class {}'
+    volumes = []
+    for selector in ['{}={}'.format(VOLUME_NODE_LABEL, minion_id),
+                     '!{}'.format(VOLUME_NODE_LABEL)]:
+        result = customObjectsApi.list_cluster_custom_object(
+            group="storage.metalk8s.scality.com",
+            version="v1alpha1",
+            plural="volumes",
+            label_selector=selector
         )
-        return __utils__['pillar_utils.errors_to_dict'](
-            [error_tplt.format(exc)]
+        volumes.extend(
+            volume for volume in result['items']
+            if volume['spec']['nodeName'] == minion_id
         )
+    return volumes
+
+
+def list_volumes(api_client, minion_id, storage_classes=None):
+    """List the volumes of a node, with their StorageClass resolved.
+
+    Only StorageClasses referenced by those volumes are retrieved,
+    `storage_classes` can be used to share them between calls.
+    """
+    if storage_classes is None:
+        storage_classes = {}
 
     try:
-        volumes = customObjectsApi.list_cluster_custom_object(
-            group="storage.metalk8s.scality.com",
-            version="v1alpha1",
-            plural="volumes"
-        )
+        volumes = list_node_volumes(api_client, minion_id)
     except (ApiException, HTTPError) as exc:
         error_tplt = (
             'Exception while calling CustomObjectsAPi->list_custom_object {}'
@@ -124,24 +148,109 @@ def list_volumes(api_client, minion_id):
         )
 
     results = {}
-    local_volumes = (
-        volume for volume in volumes['items']
-        if volume['spec']['nodeName'] == minion_id
-    )
-    for volume in local_volumes:
-        name = volume['metadata']['name']
-        storageclass = storage_classes.get(
-            volume['spec']['storageClassName'],
-            volume['spec']['storageClassName']
-        )
-        volume['spec']['storageClass'] = storageclass
+    for volume in volumes:
+        storageclass_name = volume['spec']['storageClassName']
+        if storageclass_name not in storage_classes:
+            try:
+                storage_classes[storageclass_name] = get_storage_class(
+                    api_client, storageclass_name
+                )
+            except (ApiException, HTTPError) as exc:
+                error_tplt = (
+                    'Exception while calling StorageV1->read_storage_class {}'
+                )
+                return __utils__['pillar_utils.errors_to_dict'](
+                    [error_tplt.format(exc)]
+                )
+        volume['spec']['storageClass'] = \
+            storage_classes[storageclass_name] or storageclass_name
         name = volume['metadata']['name']
         results[name] = volume
 
     return results
 
 
-def ext_pillar(minion_id, pillar, kubeconfig):
+class ClusterSnapshot(object):
+    """Cluster-wide information used to compute the pillar of all minions.
+
+    Collections are listed once, and shared by all pillar computations until
+    the snapshot expires, so that refreshing the pillar of N minions does not
+    list them N times.
+    Volumes are only listed for each node when needed, and indexed by node
+    name. StorageClasses they reference are shared between nodes.
+    """
+    def __init__(self, api_client, ttl=SNAPSHOT_TTL):
+        coreV1 = kubernetes.client.CoreV1Api(api_client=api_client)
+
+        self._api_client = api_client
+        self._storage_classes = {}
+        self._volumes = {}
+        self._lock = threading.Lock()
+
+        # Writes made while listing may not be seen, so consider the
+        # snapshot taken before listing
+        self.taken_at = time.time()
+        self.nodes = coreV1.list_node().items
+        self.cluster_version = get_cluster_version(api_client=api_client)
+
+        if isinstance(self.cluster_version, dict):
+            # Do not share errors, next computation will retry
+            self.expires_at = self.taken_at
+        else:
+            self.expires_at = self.taken_at + ttl
+
+    def is_valid(self, last_write):
+        """Check if the snapshot is neither expired nor older than the last
+        write made to the cluster."""
+        return self.taken_at > last_write and time.time() < self.expires_at
+
+    def get_volumes(self, minion_id, refresh=False):
+        with self._lock:
+            volumes = None if refresh else self._volumes.get(minion_id)
+            storage_classes = dict(self._storage_classes)
+
+        if volumes is None:
+            volumes = list_volumes(
+                self._api_client, minion_id, storage_classes
+            )
+            with self._lock:
+                self._storage_classes.update(storage_classes)
+                if '_errors' not in volumes:
+                    self._volumes[minion_id] = volumes
+
+        return copy.deepcopy(volumes)
+
+
+def get_cluster_snapshot(kubeconfig, ttl=SNAPSHOT_TTL):
+    """Return the current `ClusterSnapshot`, building it if outdated.
+
+    Snapshots are kept in process-wide state, since this module is loaded
+    again for each pillar compilation. They are dropped once expired, or
+    after any write made through the `metalk8s_kubernetes` module (e.g. by
+    an orchestrate adding a node).
+    The lock is held while building, so that concurrent pillar computations
+    wait for a single snapshot instead of all listing the cluster.
+    """
+    get_process_state = __utils__['metalk8s_kubernetes.get_process_state']
+    snapshots = get_process_state('metalk8s_nodes.snapshots', dict)
+    lock = get_process_state('metalk8s_nodes.snapshots_lock', threading.Lock)
+    last_write = __utils__['metalk8s_kubernetes.get_last_write'](
+        __opts__['cachedir']
+    )
+
+    with lock:
+        snapshot = snapshots.get(kubeconfig)
+        if snapshot is None or not snapshot.is_valid(last_write):
+            client = __utils__['metalk8s_kubernetes.get_api_client'](
+                config_file=kubeconfig
+            )
+            snapshot = snapshots[kubeconfig] = ClusterSnapshot(
+                client, ttl=ttl
+            )
+    return snapshot
+
+
+def _ext_pillar(minion_id, pillar, kubeconfig):
     if not os.path.isfile(kubeconfig):
         error_tplt = '{}: kubeconfig not found at {}'
         pillar_nodes = __utils__['pillar_utils.errors_to_dict']([
@@ -156,21 +265,19 @@ def ext_pillar(minion_id, pillar, kubeconfig):
             if 'ca' in pillar['metalk8s']:
                 ca_minion = pillar['metalk8s']['ca'].get('minion', None)
 
-        client = kubernetes.config.new_client_from_config(
-            config_file=kubeconfig,
-        )
-
-        coreV1 = kubernetes.client.CoreV1Api(api_client=client)
+        snapshot = get_cluster_snapshot(kubeconfig)
 
-        node_list = coreV1.list_node()
-
-        cluster_version = get_cluster_version(api_client=client)
+        cluster_version = copy.deepcopy(snapshot.cluster_version)
         pillar_nodes = dict(
             (node.metadata.name, node_info(node, ca_minion))
-            for node in node_list.items
+            for node in snapshot.nodes
         )
 
-        volume_information = list_volumes(client, minion_id)
+        # The storage-operator passes the Volume to prepare in the pillar,
+        # it may have been created (or updated) right before
+        volume_information = snapshot.get_volumes(
+            minion_id, refresh='volume' in pillar
+        )
 
     result = {
         'metalk8s': {
@@ -183,3 +290,9 @@ def ext_pillar(minion_id, pillar, kubeconfig):
         __utils__['pillar_utils.promote_errors'](result['metalk8s'], key)
 
     return result
+
+
+def ext_pillar(minion_id, pillar, kubeconfig):
+    return __utils__['pillar_utils.timed'](_ext_pillar)(
+        minion_id, pillar, kubeconfig
+    )
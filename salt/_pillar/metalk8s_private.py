@@ -45,7 +45,7 @@ def _read_apiserver_key():
     return _read_private_key("apiserver_key", APISERVER_KEY_PATH)
 
 
-def ext_pillar(minion_id, pillar):
+def _ext_pillar(minion_id, pillar):
     nodes_info = pillar.get("metalk8s", {}).get("nodes", {})
 
     if minion_id not in nodes_info:
@@ -68,3 +68,9 @@ def ext_pillar(minion_id, pillar):
     result = {"metalk8s": private_data}
 
     return result
+
+
+def ext_pillar(minion_id, pillar):
+    return __utils__['pillar_utils.timed'](_ext_pillar)(
+        minion_id, pillar
+    )
@@ -46,5 +46,11 @@ def _load_solutions():
     return result
 
 
-def ext_pillar(minion_id, pillar):
+def _ext_pillar(minion_id, pillar):
     return {"metalk8s": {'solutions': _load_solutions()}}
+
+
+def ext_pillar(minion_id, pillar):
+    return __utils__['pillar_utils.timed'](_ext_pillar)(
+        minion_id, pillar
+    )
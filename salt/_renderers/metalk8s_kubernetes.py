@@ -19,6 +19,11 @@ The supported options are:
   salt-master configuration
 - `absent`, a boolean to toggle which state function variant (`object_present`
   or `object_absent`) to use (defaults to False)
+- `batch`, a boolean to render a single `objects_present` state applying all
+  the objects of the stream, concurrently where possible, instead of one state
+  per object (defaults to False, cannot be used with `absent`)
+- `concurrency`, the maximum number of objects applied concurrently in
+  `batch` mode (defaults to the `objects_present` default)
 """
 import yaml
 
@@ -70,12 +75,61 @@ def _step(manifest, kubeconfig=None, context=None, absent=False):
     return step_name, {state_func: state_args}
 
 
+def _parse_bool(args, key, default=False):
+    value = args.get(key, [None])[0]
+    if value is None:
+        return default
+    if value.lower() in ('true', 'yes', '1'):
+        return True
+    if value.lower() in ('false', 'no', '0'):
+        return False
+    raise SaltRenderError(
+        'Invalid value "{}" for option `{}`, expected a boolean.'.format(
+            value, key
+        )
+    )
+
+
+def _parse_int(args, key, default=None):
+    value = args.get(key, [None])[0]
+    if value is None:
+        return default
+    try:
+        result = int(value)
+    except ValueError:
+        result = 0
+    if result < 1:
+        raise SaltRenderError(
+            'Invalid value "{}" for option `{}`, expected a positive '
+            'integer.'.format(value, key)
+        )
+    return result
+
+
+def _batch_step(manifests, sls, kubeconfig=None, context=None,
+                concurrency=None):
+    """Render a stream of Kubernetes objects into a single state 'step'."""
+    step_name = "Apply all objects from '{}'".format(sls)
+    state_args = [
+        {'name': step_name},
+        {'kubeconfig': kubeconfig},
+        {'context': context},
+        {'manifests': manifests},
+    ]
+    if concurrency is not None:
+        state_args.append({'concurrency': concurrency})
+
+    return step_name, {'metalk8s_kubernetes.objects_present': state_args}
+
+
 def render(source, saltenv='', sls='', argline='', **kwargs):
     args = six.moves.urllib.parse.parse_qs(argline)
 
     kubeconfig = args.get('kubeconfig', [None])[0]
     context = args.get('context', [None])[0]
     absent = args.get('absent', [False])[0]
+    batch = _parse_bool(args, 'batch')
+    concurrency = _parse_int(args, 'concurrency')
 
     if not isinstance(source, six.string_types):
         # Assume it is a file handle
@@ -83,6 +137,22 @@ def render(source, saltenv='', sls='', argline='', **kwargs):
 
     data = yaml.load_all(source, Loader=SaltYamlSafeLoader)
 
+    if batch:
+        if absent:
+            raise SaltRenderError(
+                'Options `batch` and `absent` cannot be used together.'
+            )
+
+        manifests = [manifest for manifest in data if manifest]
+        for manifest in manifests:
+            # Validate object names as done in non-batch mode
+            _step_name(manifest)
+
+        return OrderedDict([_batch_step(
+            manifests, sls,
+            kubeconfig=kubeconfig, context=context, concurrency=concurrency
+        )])
+
     return OrderedDict(
         _step(manifest, kubeconfig=kubeconfig, context=context, absent=absent)
         for manifest in data if manifest
@@ -105,3 +105,83 @@ def image_managed(name, archive_path=None):
             ret['comment'] = 'Failed to pull image'
 
     return ret
+
+
+def images_managed(name, images, concurrency=None):
+    '''
+    Load several images in the CRI image cache, from local Docker archives.
+
+    Images already present are skipped, others are imported in parallel.
+
+    name
+        Name of the state
+    images
+        List of images, each a dict with `name` and `archive_path` keys
+    concurrency
+        Maximum number of archives imported at once, defaults to
+        `IMPORT_CONCURRENCY` from the `containerd` execution module
+    '''
+
+    ret = {
+        'name': name,
+        'result': False,
+        'changes': {},
+        'pchanges': {},
+        'comment': '',
+    }
+
+    archives = [(image['name'], image['archive_path']) for image in images]
+
+    if __opts__['test']:
+        available = __salt__['cri.available_many'](
+            [image for image, _ in archives]
+        )
+        missing = [image for image, _ in archives if not available[image]]
+        if not missing:
+            ret['comment'] = 'All images already available'
+            ret['result'] = True
+            return ret
+
+        ret['comment'] = 'Will import {} archives'.format(len(missing))
+        ret['result'] = None
+        ret['pchanges'].update(
+            (image, {'old': {}, 'new': {'name': image, 'digests': {}}})
+            for image in missing
+        )
+        return ret
+
+    load_kwargs = {}
+    if concurrency is not None:
+        load_kwargs['concurrency'] = concurrency
+
+    results = __salt__['containerd.load_cri_images'](archives, **load_kwargs)
+
+    failed = []
+    for image, result in results.items():
+        if result['skipped']:
+            continue
+        if result['result']:
+            ret['changes'][image] = {
+                'old': {},
+                'new': os.path.basename(result['archive_path']),
+                'duration': result['duration'],
+                'bytes': result['bytes'],
+            }
+        else:
+            failed.append('{}: {}'.format(image, result['comment']))
+
+    if failed:
+        ret['comment'] = 'Failed to import archives:\n{}'.format(
+            '\n'.join(failed)
+        )
+    elif ret['changes']:
+        ret['comment'] = 'Imported {} archives (longest import: {}s)'.format(
+            len(ret['changes']),
+            max(change['duration'] for change in ret['changes'].values())
+        )
+        ret['result'] = True
+    else:
+        ret['comment'] = 'All images already available'
+        ret['result'] = True
+
+    return ret
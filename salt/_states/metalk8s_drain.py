@@ -32,3 +32,36 @@ def node_drained(
     }
 
     return ret
+
+
+def nodes_drained(
+        name,
+        nodes,
+        **kwargs
+):
+    ret = {
+        'name': name,
+        'changes': {},
+        'result': False,
+        'comment': ''
+    }
+
+    if __opts__['test']:
+        ret['result'] = None
+        ret['comment'] = 'The nodes {0} are going to be drained'.format(
+            ', '.join(nodes)
+        )
+        return ret
+
+    res = __salt__['metalk8s_kubernetes.nodes_drain'](nodes, **kwargs)
+
+    ret['result'] = True
+    ret['comment'] = 'Nodes {0} drained'.format(', '.join(sorted(res)))
+
+    for node, node_res in res.items():
+        ret['changes'][node] = {
+            'status': 'drained',
+            'duration': node_res['duration'],
+        }
+
+    return ret
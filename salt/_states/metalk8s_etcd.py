@@ -6,6 +6,10 @@ log = logging.getLogger(__name__)
 
 __virtualname__ = 'metalk8s_etcd'
 
+# DB size (in bytes) above which to defragment etcd, half of the default
+# etcd backend quota (2 GiB)
+DEFRAG_MAX_DB_SIZE = 1024 * 1024 * 1024
+
 
 def __virtual__():
     if 'metalk8s_etcd.add_etcd_node' not in __salt__:
@@ -57,3 +61,80 @@ def member_present(name, peer_urls):
         ret['comment'] = 'Node added in etcd cluster'
 
     return ret
+
+
+def defragmented(name, max_db_size=DEFRAG_MAX_DB_SIZE, **kwargs):
+    """Ensure the etcd database is compacted and defragmented.
+
+    Members are only defragmented if one of them has a database bigger than
+    `max_db_size` (in bytes), so this state can be applied regularly.
+
+    Arguments:
+        max_db_size (int): DB size (in bytes) above which to defragment,
+            1 GiB by default
+        retained_revisions (int): number of revisions to keep when compacting
+    """
+    ret = {'name': name,
+           'changes': {},
+           'result': False,
+           'comment': ''}
+
+    try:
+        max_db_size = int(max_db_size)
+    except (TypeError, ValueError):
+        max_db_size = -1
+    if max_db_size <= 0:
+        ret['comment'] = (
+            'Invalid max_db_size, must be a positive number of bytes'
+        )
+        return ret
+
+    certs = dict(
+        (key, kwargs[key])
+        for key in ['ca_cert', 'cert_key', 'cert_cert']
+        if key in kwargs
+    )
+
+    try:
+        report = __salt__['metalk8s_etcd.get_health_report'](**certs)
+    except Exception as exc:  # pylint: disable=broad-except
+        ret['comment'] = 'Unable to check etcd cluster health: {}'.format(exc)
+        return ret
+
+    db_sizes = dict(
+        (member, info['db_size'])
+        for member, info in report['members'].items()
+        if info['healthy']
+    )
+    if db_sizes and max(db_sizes.values()) <= max_db_size:
+        ret['result'] = True
+        ret['comment'] = 'etcd DB size is below {} bytes: {}'.format(
+            max_db_size, db_sizes
+        )
+        return ret
+
+    if __opts__['test']:
+        ret['result'] = None
+        ret['comment'] = 'etcd would be compacted and defragmented'
+        ret['changes'] = {'db_size': db_sizes}
+        return ret
+
+    try:
+        result = __salt__['metalk8s_etcd.defragment'](**kwargs)
+    except Exception as exc:  # pylint: disable=broad-except
+        ret['comment'] = 'Failed to defragment etcd: {}'.format(exc)
+        info = getattr(exc, 'info', None)
+        if info:
+            ret['changes'] = info
+        return ret
+
+    ret['result'] = True
+    ret['changes'] = result
+    ret['comment'] = (
+        'etcd compacted and defragmented, {} bytes reclaimed in {}s'.format(
+            result['reclaimed'],
+            sum(member['duration'] for member in result['members'].values())
+        )
+    )
+
+    return ret
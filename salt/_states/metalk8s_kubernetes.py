@@ -1,14 +1,46 @@
 """Management of Kubernetes objects as Salt states.
 
 This module defines three state functions: `object_present`, `object_absent`
-and `object_updated`.
+and `object_updated`, as well as `objects_present` to apply a batch of
+objects at once.
 Those will then simply delegate all the logic to the `metalk8s_kubernetes`
 execution module, only managing simple dicts in this state module.
 """
+from multiprocessing.pool import ThreadPool
+import threading
 import time
 
+from salt.exceptions import CommandExecutionError
 from salt.utils import yaml
 
+# Default number of objects applied concurrently by `objects_present`
+BATCH_CONCURRENCY = 10
+
+# Objects in a batch are applied in successive "waves", based on their kind,
+# so that objects others may depend on get created first. Kinds not listed
+# here are applied in the `DEFAULT_KIND_WAVE`, and custom objects last.
+KIND_WAVES = {
+    'Namespace': 0,
+    'CustomResourceDefinition': 0,
+    'ServiceAccount': 1,
+    'Secret': 1,
+    'ConfigMap': 1,
+    'ClusterRole': 1,
+    'Role': 1,
+    'PodSecurityPolicy': 1,
+    'StorageClass': 1,
+    'ClusterRoleBinding': 2,
+    'RoleBinding': 2,
+}
+DEFAULT_KIND_WAVE = 3
+CUSTOM_KIND_WAVE = 4
+
+# Maximum time (in seconds) to wait for CustomResourceDefinitions of a batch
+# to be established, before applying custom objects
+CRD_ESTABLISHED_TIMEOUT = 60
+
+_WRITE_COUNTERS_LOCK = threading.Lock()
+
 __virtualname__ = 'metalk8s_kubernetes'
 
 
@@ -102,6 +134,22 @@ def object_absent(name, manifest=None, wait=None, **kwargs):
     return ret
 
 
+def _count_write(outcome):
+    """Count skipped and written objects for the current state run.
+
+    Returns a summary of the counters, to be used in state comments.
+    """
+    with _WRITE_COUNTERS_LOCK:
+        counters = __context__.setdefault(
+            'metalk8s_kubernetes.object_present.writes',
+            {'skipped': 0, 'written': 0}
+        )
+        counters[outcome] += 1
+        return '{skipped} skipped, {written} written in this run'.format(
+            **counters
+        )
+
+
 def object_present(name, manifest=None, **kwargs):
     """Ensure that the object is present.
 
@@ -112,13 +160,41 @@ def object_present(name, manifest=None, **kwargs):
     """
     ret = {'name': name, 'changes': {}, 'result': True, 'comment': ''}
 
-    # Only pass `name` if we have no manifest
-    name_arg = None if manifest else name
+    if not manifest:
+        # Render the manifest once, for both the comparison and the write
+        try:
+            manifest = __salt__[
+                'metalk8s_kubernetes.read_and_render_yaml_file'
+            ](
+                source=name,
+                template=kwargs.get('template', 'jinja'),
+                context=kwargs.get('defaults'),
+                saltenv=__env__
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            ret['result'] = False
+            ret['comment'] = 'Failed to render manifest {}: {}'.format(
+                name, exc
+            )
+            return ret
 
     obj = __salt__['metalk8s_kubernetes.get_object'](
-        name=name_arg, manifest=manifest, saltenv=__env__,
-        **kwargs
+        manifest=manifest, saltenv=__env__, **kwargs
     )
+
+    if obj is not None:
+        # Only compare fields owned by the user (i.e. set in the manifest, or
+        # removed from it since the last write), we don't want to replace the
+        # object if nothing changed
+        diff_paths = __salt__['metalk8s_kubernetes.diff_object'](
+            obj, manifest=manifest, saltenv=__env__
+        )
+        if not diff_paths:
+            ret['comment'] = 'The object is already good ({})'.format(
+                _count_write('skipped')
+            )
+            return ret
+
     if __opts__['test']:
         ret['result'] = None
         ret['comment'] = 'The object is going to be {}'.format(
@@ -128,27 +204,23 @@ def object_present(name, manifest=None, **kwargs):
 
     if obj is None:
         __salt__['metalk8s_kubernetes.create_object'](
-            name=name_arg, manifest=manifest, saltenv=__env__,
-            **kwargs
+            manifest=manifest, saltenv=__env__, **kwargs
         )
         ret['changes'] = {'old': 'absent', 'new': 'present'}
-        ret['comment'] = 'The object was created'
+        ret['comment'] = 'The object was created ({})'.format(
+            _count_write('written')
+        )
 
         return ret
 
-    # TODO: Attempt to handle idempotency as much as possible here, we don't
-    #       want to always replace if nothing changed. Currently though, we
-    #       don't know how to achieve this, since some fields may be set by
-    #       api-server or by the user without us being able to distinguish
-    #       them.
     new = __salt__['metalk8s_kubernetes.replace_object'](
-        name=name_arg, manifest=manifest, old_object=obj,
-        saltenv=__env__,
-        **kwargs
+        manifest=manifest, old_object=obj, saltenv=__env__, **kwargs
     )
     diff = __utils__['dictdiffer.recursive_diff'](obj, new)
     ret['changes'] = diff.diffs
-    ret['comment'] = 'The object was replaced'
+    ret['comment'] = 'The object was replaced ({})'.format(
+        _count_write('written')
+    )
 
     return ret
 
@@ -209,3 +281,149 @@ def object_updated(name, manifest=None, **kwargs):
     ret['comment'] = 'The object was updated'
 
     return ret
+
+
+def _object_step_name(manifest):
+    metadata = manifest.get('metadata', {})
+    full_name = metadata.get('name')
+    if metadata.get('namespace') is not None:
+        full_name = '{}/{}'.format(metadata['namespace'], full_name)
+
+    return '{}/{} {}'.format(
+        manifest.get('apiVersion'), manifest.get('kind'), full_name
+    )
+
+
+def _object_wave(manifest):
+    try:
+        kind_info = __utils__['metalk8s_kubernetes.get_kind_info'](manifest)
+    except ValueError:
+        # Let `object_present` report the error
+        return DEFAULT_KIND_WAVE
+
+    # Only standard kinds have a model
+    if not hasattr(kind_info, 'model'):
+        return CUSTOM_KIND_WAVE
+
+    return KIND_WAVES.get(manifest['kind'], DEFAULT_KIND_WAVE)
+
+
+def _crd_is_established(manifest, **kwargs):
+    try:
+        crd = __salt__['metalk8s_kubernetes.get_object'](
+            manifest=manifest, saltenv=__env__, **kwargs
+        )
+    except CommandExecutionError:
+        return False
+    conditions = ((crd or {}).get('status') or {}).get('conditions') or []
+    return any(
+        condition['type'] == 'Established' and condition['status'] == 'True'
+        for condition in conditions
+    )
+
+
+def _wait_crds_established(manifests, timeout=CRD_ESTABLISHED_TIMEOUT,
+                           **kwargs):
+    """Wait for CustomResourceDefinitions to be established.
+
+    Returns an error message if some are not established within `timeout`.
+    """
+    pending = list(manifests)
+    deadline = time.time() + timeout
+    while True:
+        pending = [
+            manifest for manifest in pending
+            if not _crd_is_established(manifest, **kwargs)
+        ]
+        if not pending:
+            return None
+        if time.time() >= deadline:
+            return 'CustomResourceDefinitions not established after {}s: {}'\
+                .format(timeout, ', '.join(
+                    manifest['metadata']['name'] for manifest in pending
+                ))
+        time.sleep(1)
+
+
+def objects_present(name, manifests, concurrency=BATCH_CONCURRENCY, **kwargs):
+    """Ensure that all the objects from a list of manifests are present.
+
+    Objects are grouped by kind into successive waves (Namespaces and
+    CustomResourceDefinitions first, custom objects last), and objects within
+    a wave are applied concurrently using `object_present`.
+
+    Arguments:
+        name (str): Name of the batch
+        manifests (list): Manifests content
+        concurrency (int): Maximum number of objects applied concurrently
+    """
+    ret = {'name': name, 'changes': {}, 'result': True, 'comment': ''}
+
+    waves = {}
+    for manifest in manifests:
+        waves.setdefault(_object_wave(manifest), []).append(manifest)
+
+    def _apply(manifest):
+        step_name = _object_step_name(manifest)
+        try:
+            return step_name, object_present(
+                step_name, manifest=manifest, **kwargs
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            return step_name, {
+                'name': step_name,
+                'changes': {},
+                'result': False,
+                'comment': str(exc),
+            }
+
+    results = []
+    pool = ThreadPool(processes=max(1, min(int(concurrency), len(manifests))))
+    try:
+        for wave in sorted(waves):
+            if wave == CUSTOM_KIND_WAVE and not __opts__['test']:
+                error = _wait_crds_established(
+                    [
+                        manifest for manifest in manifests
+                        if manifest.get('kind') == 'CustomResourceDefinition'
+                    ],
+                    **kwargs
+                )
+                if error:
+                    results.extend(
+                        (step_name, {
+                            'name': step_name,
+                            'changes': {},
+                            'result': False,
+                            'comment': error,
+                        })
+                        for step_name in map(_object_step_name, waves[wave])
+                    )
+                    continue
+            results.extend(pool.map(_apply, waves[wave]))
+    finally:
+        pool.close()
+        pool.join()
+
+    failures = []
+    changed = 0
+    for step_name, step_ret in results:
+        if step_ret['changes']:
+            ret['changes'][step_name] = step_ret['changes']
+            changed += 1
+        if step_ret['result'] is False:
+            failures.append('{}: {}'.format(step_name, step_ret['comment']))
+        elif step_ret['result'] is None:
+            ret['result'] = None
+
+    if failures:
+        ret['result'] = False
+        ret['comment'] = 'Failed to apply {} out of {} objects:\n{}'.format(
+            len(failures), len(results), '\n'.join(failures)
+        )
+    else:
+        ret['comment'] = 'Applied {} objects ({} changed)'.format(
+            len(results), changed
+        )
+
+    return ret
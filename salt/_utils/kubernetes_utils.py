@@ -1,12 +1,19 @@
 """Utility methods for manipulation of Kubernetes objects in Python.
 """
+import copy
 import datetime
 from functools import partial
 import inspect
 import keyword
+import logging
 import operator
+import os.path
 from pprint import pformat
 import re
+import sys
+import threading
+import time
+import types
 
 from salt.ext import six
 from salt.utils.dictdiffer import recursive_diff
@@ -15,6 +22,7 @@ try:
     import kubernetes.config
     import kubernetes.client as k8s_client
     import kubernetes.client.apis as k8s_apis
+    import kubernetes.watch
 
     # Workaround for https://github.com/kubernetes-client/python/issues/376
     def set_conditions(self, conditions):
@@ -39,6 +47,8 @@ else:
     )
 
 
+log = logging.getLogger(__name__)
+
 __virtualname__ = 'metalk8s_kubernetes'
 
 
@@ -49,6 +59,29 @@ def __virtual__():
     return __virtualname__
 
 
+_PROCESS_STATE_MODULE = 'metalk8s_kubernetes_process_state'
+
+
+def get_process_state(name, factory):
+    """Return a process-wide object, built with `factory` on first use.
+
+    Loader modules are executed again whenever their loader is built (e.g.
+    once per pillar compilation on the salt-master), which resets their
+    globals. Objects meant to live as long as the process are thus kept in a
+    module registered in `sys.modules`, shared by all loaders.
+    """
+    state = sys.modules.get(_PROCESS_STATE_MODULE)
+    if state is None:
+        new_state = types.ModuleType(_PROCESS_STATE_MODULE)
+        new_state.lock = threading.Lock()
+        state = sys.modules.setdefault(_PROCESS_STATE_MODULE, new_state)
+
+    with state.lock:
+        if not hasattr(state, name):
+            setattr(state, name, factory())
+        return getattr(state, name)
+
+
 # Roughly equivalent to an Enum, for Python 2
 class ObjectScope(object):
     NAMESPACE = 'namespaced'
@@ -74,6 +107,193 @@ class ObjectScope(object):
         return 'ObjectScope({})'.format(self.value)
 
 
+class _ClientCache(object):
+    """Process-wide cache of configured `kubernetes.client.ApiClient`.
+
+    Building a client from a kubeconfig means parsing the file, loading the
+    TLS material and opening a new connection pool, so we keep configured
+    clients around and share them between calls made in the same process.
+
+    Entries are keyed by `(kubeconfig path, kubeconfig mtime, context,
+    persist_config)`, so that any change to the kubeconfig file yields a new
+    client. Entries not used for `idle_timeout` seconds are evicted, and their
+    connection pool closed.
+    """
+    def __init__(self, idle_timeout):
+        self._idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    idle_timeout = property(operator.attrgetter('_idle_timeout'))
+
+    @staticmethod
+    def _key(config_file, context, persist_config):
+        path = os.path.abspath(os.path.expanduser(
+            config_file or
+            kubernetes.config.kube_config.KUBE_CONFIG_DEFAULT_LOCATION
+        ))
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        return (path, mtime, context, persist_config)
+
+    def get(self, config_file=None, context=None, persist_config=False):
+        key = self._key(config_file, context, persist_config)
+        now = time.time()
+
+        with self._lock:
+            self._evict_idle(now)
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._hits += 1
+                entry[1] = now
+                return entry[0]
+
+            self._misses += 1
+            client = kubernetes.config.new_client_from_config(
+                config_file, context, persist_config
+            )
+            _count_requests(client)
+            self._entries[key] = [client, now]
+
+        log.debug(
+            'Configured new Kubernetes API client for %s (context: %s)',
+            key[0], context
+        )
+        return client
+
+    def _evict_idle(self, now):
+        for key, (client, last_used) in list(self._entries.items()):
+            if now - last_used > self._idle_timeout:
+                del self._entries[key]
+                self._evictions += 1
+                _close_client(client)
+                log.debug(
+                    'Evicted idle Kubernetes API client for %s '
+                    '(context: %s)', key[0], key[2]
+                )
+
+    def clear(self):
+        with self._lock:
+            for client, _ in self._entries.values():
+                _close_client(client)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+            }
+
+
+def _close_client(client):
+    """Close the connection pool of a `kubernetes.client.ApiClient`."""
+    try:
+        client.rest_client.pool_manager.clear()
+    except AttributeError:
+        pass
+
+
+# Counters are shared with cached clients, which outlive this module
+_API_STATS = get_process_state('api_stats', lambda: {'calls': 0, 'bytes': 0})
+_API_STATS_LOCK = get_process_state('api_stats_lock', threading.Lock)
+
+
+def _count_requests(client):
+    """Count requests (and received bytes) made by an API client.
+
+    Streamed responses (e.g. watches) are counted, but not their payload.
+    """
+    request = client.rest_client.request
+
+    def counted_request(*args, **kwargs):
+        response = None
+        try:
+            response = request(*args, **kwargs)
+            return response
+        finally:
+            size = 0
+            if response is not None and \
+                    kwargs.get('_preload_content', True):
+                size = len(response.data or '')
+            with _API_STATS_LOCK:
+                _API_STATS['calls'] += 1
+                _API_STATS['bytes'] += size
+
+    client.rest_client.request = counted_request
+
+
+def get_api_stats():
+    """Return the number of API requests made, and bytes received, by all
+    cached API clients in the current process."""
+    with _API_STATS_LOCK:
+        return dict(_API_STATS)
+
+
+# Idle time (in seconds) after which a cached API client gets evicted
+CLIENT_CACHE_IDLE_TIMEOUT = 300
+
+_CLIENT_CACHE = get_process_state(
+    'client_cache',
+    lambda: _ClientCache(idle_timeout=CLIENT_CACHE_IDLE_TIMEOUT)
+)
+
+
+def get_api_client(config_file=None, context=None, persist_config=False):
+    """Return a configured `kubernetes.client.ApiClient`, from cache if any.
+
+    Clients are shared by all callers in the current process, keeping their
+    connections alive across calls.
+    """
+    return _CLIENT_CACHE.get(
+        config_file=config_file,
+        context=context,
+        persist_config=persist_config,
+    )
+
+
+def get_client_cache_stats():
+    """Return hit/miss/eviction counters of the API client cache."""
+    return _CLIENT_CACHE.stats()
+
+
+def clear_client_cache():
+    """Drop all cached API clients, closing their connection pools."""
+    _CLIENT_CACHE.clear()
+
+
+# File, in the Salt cache directory, touched after each write made through
+# the `metalk8s_kubernetes` module, so that other processes (e.g. salt-master
+# workers rendering pillars) know their snapshots of the cluster are outdated
+WRITE_MARKER = 'metalk8s_kubernetes.last_write'
+
+
+def record_write(cachedir):
+    """Record that an object was written to the API."""
+    path = os.path.join(cachedir, WRITE_MARKER)
+    try:
+        with open(path, 'a'):
+            os.utime(path, None)
+    except (IOError, OSError) as exc:
+        log.debug('Unable to record write in %s: %s', path, exc)
+
+
+def get_last_write(cachedir):
+    """Return the time of the last write recorded with `record_write`."""
+    try:
+        return os.path.getmtime(os.path.join(cachedir, WRITE_MARKER))
+    except OSError:
+        return 0
+
+
 class ApiClient(object):
     CRUD_METHODS = {
         'create': 'create',
@@ -140,9 +360,11 @@ class ApiClient(object):
         return _list
 
     def configure(self, config_file=None, context=None, persist_config=False):
-        self._client = kubernetes.config.new_client_from_config(
-            config_file, context, persist_config
-        )
+        client = get_api_client(config_file, context, persist_config)
+        if client is not self._client:
+            # Drop the API instance bound to the previous client, if any
+            self._client = client
+            self._api = None
 
     @property
     def api(self):
@@ -345,6 +567,11 @@ if HAS_LIBS:
         ),
         # }}}
         # /apis/policy/v1beta1/ {{{
+        ('policy/v1beta1', 'PodDisruptionBudget'): KindInfo(
+            model=k8s_client.V1beta1PodDisruptionBudget,
+            api_cls=k8s_client.PolicyV1beta1Api,
+            name='namespaced_pod_disruption_budget',
+        ),
         ('policy/v1beta1', 'PodSecurityPolicy'): KindInfo(
             model=k8s_client.PolicyV1beta1PodSecurityPolicy,
             api_cls=k8s_client.PolicyV1beta1Api,
@@ -457,7 +684,10 @@ class CustomApiClient(ApiClient):
                 return CustomObject({
                     'kind': '{}List'.format(self.kind),
                     'apiVersion': '{s.group}/{s.version}'.format(s=self),
-                    'items': [CustomObject(obj) for obj in result],
+                    'metadata': result.get('metadata') or {},
+                    'items': [
+                        CustomObject(obj) for obj in result.get('items', [])
+                    ],
                 })
 
             # TODO: do we have a result for `delete` methods?
@@ -519,6 +749,8 @@ if HAS_LIBS:
                    scope='namespaced', plural='prometheusrules'),
         CRKindInfo('monitoring.coreos.com/v1', 'ServiceMonitor',
                    scope='namespaced', plural='servicemonitors'),
+        CRKindInfo('storage.metalk8s.scality.com/v1alpha1', 'Volume',
+                   scope='cluster', plural='volumes'),
     ]
 
     KNOWN_CUSTOM_KINDS = {kind.key: kind for kind in _CUSTOM_KINDS}
@@ -651,6 +883,398 @@ def get_kind_info(manifest):
     return kind_info
 
 
+class ObjectCache(object):
+    """Local cache of all the objects of a kind, kept up to date by a watch.
+
+    This is a simple take on the "shared informer" from client-go: all the
+    objects are listed once, then a background thread watches changes from
+    the listed resourceVersion, re-listing everything if the watch breaks.
+
+    Reads are only served if the cache was in sync with the API server less
+    than `max_staleness` seconds ago, otherwise callers are expected to fall
+    back to the API (reads return `None` in this case).
+
+    Objects are stored as dicts, as returned by the `to_dict` method of
+    `kubernetes.client` models (or raw dicts for custom objects).
+
+    The background thread runs until `stop` is called.
+    """
+    # Interval (in seconds) before restarting a broken watch
+    RETRY_INTERVAL = 5
+
+    def __init__(self, name, kind_info, config_file=None, context=None,
+                 max_staleness=30, namespace=None):
+        self._name = name
+        self._kind_info = kind_info
+        self._namespace = namespace
+        self._config_file = config_file
+        self._context = context
+        self._max_staleness = max_staleness
+
+        self._lock = threading.Lock()
+        self._objects = {}
+        # Keys of objects which may be outdated, until the next watch event
+        self._invalidated = set()
+        self._resource_version = None
+        self._synced_at = None
+        self._thread = None
+        self._stopped = threading.Event()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'resyncs': 0,
+            'watch_restarts': 0,
+            'events': 0,
+        }
+
+    name = property(operator.attrgetter('_name'))
+    max_staleness = property(operator.attrgetter('_max_staleness'))
+
+    @property
+    def is_fresh(self):
+        return (
+            self._thread is not None and self._thread.is_alive() and
+            not self._stopped.is_set() and
+            self._synced_at is not None and
+            time.time() - self._synced_at <= self._max_staleness
+        )
+
+    def get(self, namespace, name):
+        """Retrieve an object from the cache.
+
+        Returns a tuple `(found, obj)`, `found` being False if the cache
+        cannot serve the request, and `obj` being `None` if the object does
+        not exist.
+        """
+        if not self._ensure_started():
+            return False, None
+
+        with self._lock:
+            if not self.is_fresh or (namespace, name) in self._invalidated:
+                self._stats['misses'] += 1
+                return False, None
+            self._stats['hits'] += 1
+            return True, copy.deepcopy(self._objects.get((namespace, name)))
+
+    def list(self, namespace=None, label_selector=None):
+        """List objects from the cache, optionally filtered.
+
+        Returns `None` if the cache cannot serve the request (in particular if
+        the label selector is not supported by `match_label_selector`).
+        """
+        if not self._ensure_started():
+            return None
+
+        with self._lock:
+            if not self.is_fresh or self._invalidated:
+                self._stats['misses'] += 1
+                return None
+            objects = list(self._objects.values())
+
+        try:
+            result = [
+                copy.deepcopy(obj) for obj in objects
+                if (namespace is None or
+                    obj['metadata'].get('namespace') == namespace) and
+                (not label_selector or match_label_selector(
+                    label_selector, obj['metadata'].get('labels')
+                ))
+            ]
+        except ValueError:
+            with self._lock:
+                self._stats['misses'] += 1
+            return None
+
+        with self._lock:
+            self._stats['hits'] += 1
+        return result
+
+    def store(self, obj):
+        """Store an object written to the API, as a dict.
+
+        The object is ignored if the cache already holds a more recent
+        version of it (e.g. from a watch event).
+        """
+        key = (obj['metadata'].get('namespace'), obj['metadata']['name'])
+        with self._lock:
+            if _is_newer(obj, self._objects.get(key)):
+                self._objects[key] = copy.deepcopy(obj)
+                self._invalidated.discard(key)
+
+    def invalidate(self, namespace, name):
+        """Stop serving an object until the next watch event about it.
+
+        Used after a deletion, the object may be gone or only marked for
+        deletion.
+        """
+        with self._lock:
+            self._invalidated.add((namespace, name))
+
+    def stop(self):
+        """Stop the background watch."""
+        self._stopped.set()
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                size=len(self._objects),
+                fresh=self.is_fresh,
+                resource_version=self._resource_version,
+            )
+
+    def _ensure_started(self):
+        if self._stopped.is_set():
+            return False
+        if self._thread is not None and self._thread.is_alive():
+            return True
+
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return True
+            try:
+                self._resync()
+            except Exception as exc:  # pylint: disable=broad-except
+                log.warning(
+                    'Unable to list objects for the %s cache: %s',
+                    self.name, exc
+                )
+                self._stats['misses'] += 1
+                return False
+            self._thread = threading.Thread(
+                target=self._run,
+                name='metalk8s-object-cache-{}'.format(self.name)
+            )
+            self._thread.daemon = True
+            self._thread.start()
+        return True
+
+    def _list_method(self):
+        """Return the API method listing objects of this kind, and its
+        additional keyword arguments."""
+        client = get_api_client(self._config_file, self._context)
+        kind_client = self._kind_info.client
+
+        if isinstance(kind_client, CustomApiClient):
+            api = k8s_client.CustomObjectsApi(api_client=client)
+            kwargs = {
+                'group': kind_client.group,
+                'version': kind_client.version,
+                'plural': kind_client.plural,
+            }
+            if self._namespace is not None:
+                kwargs['namespace'] = self._namespace
+                return api.list_namespaced_custom_object, kwargs
+            return api.list_cluster_custom_object, kwargs
+
+        api = kind_client.api_cls(api_client=client)
+        if self._namespace is not None:
+            return getattr(api, 'list_{}'.format(kind_client.name)), {
+                'namespace': self._namespace,
+            }
+        if self._kind_info.scope == ObjectScope.NAMESPACE:
+            method_name = 'list_{}_for_all_namespaces'.format(
+                kind_client.name[len('namespaced_'):]
+            )
+        else:
+            method_name = 'list_{}'.format(kind_client.name)
+        return getattr(api, method_name), {}
+
+    def _resync(self):
+        """List all objects and replace the cache content.
+
+        Must be called with the lock held.
+        """
+        method, kwargs = self._list_method()
+        result = method(**kwargs)
+
+        if isinstance(result, dict):
+            items = result.get('items', [])
+            resource_version = result['metadata']['resourceVersion']
+        else:
+            items = [item.to_dict() for item in result.items]
+            resource_version = result.metadata.resource_version
+
+        self._objects = dict(
+            (
+                (obj['metadata'].get('namespace'), obj['metadata']['name']),
+                obj
+            )
+            for obj in items
+        )
+        self._invalidated.clear()
+        self._resource_version = resource_version
+        self._synced_at = time.time()
+        self._stats['resyncs'] += 1
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                if self._resource_version is None:
+                    with self._lock:
+                        self._resync()
+                self._watch()
+            except Exception as exc:  # pylint: disable=broad-except
+                log.warning(
+                    'Watch for the %s cache failed, restarting: %s',
+                    self.name, exc
+                )
+                with self._lock:
+                    self._resource_version = None
+                    self._stats['watch_restarts'] += 1
+                self._stopped.wait(self.RETRY_INTERVAL)
+
+    def _watch(self):
+        method, kwargs = self._list_method()
+        watcher = kubernetes.watch.Watch()
+
+        # Bound the watch duration, so that we regularly know we are in sync
+        timeout = max(1, int(self._max_staleness // 2))
+        for event in watcher.stream(
+                method,
+                resource_version=self._resource_version,
+                timeout_seconds=timeout,
+                **kwargs):
+            if event['type'] == 'ERROR':
+                # e.g. resource version too old, we need to re-list
+                log.debug(
+                    'Error event in watch for the %s cache: %s',
+                    self.name, event['raw_object']
+                )
+                with self._lock:
+                    self._resource_version = None
+                return
+
+            obj = event['object']
+            if not isinstance(obj, dict):
+                obj = obj.to_dict()
+            key = (obj['metadata'].get('namespace'), obj['metadata']['name'])
+
+            with self._lock:
+                if event['type'] == 'DELETED':
+                    self._objects.pop(key, None)
+                elif _is_newer(obj, self._objects.get(key)):
+                    self._objects[key] = obj
+                self._invalidated.discard(key)
+                self._resource_version = watcher.resource_version
+                self._synced_at = time.time()
+                self._stats['events'] += 1
+
+        with self._lock:
+            self._synced_at = time.time()
+
+
+def _is_newer(obj, current):
+    """Check if `obj` is at least as recent as `current`, based on their
+    resourceVersion (which are etcd revisions in practice)."""
+    if current is None:
+        return True
+    versions = []
+    for item in (obj, current):
+        metadata = item.get('metadata') or {}
+        try:
+            versions.append(int(
+                metadata.get('resource_version') or
+                metadata.get('resourceVersion')
+            ))
+        except (TypeError, ValueError):
+            return True
+    return versions[0] >= versions[1]
+
+
+# Caches (and their watch threads) are shared by all loaders of the process
+_OBJECT_CACHES = get_process_state('object_caches', dict)
+_OBJECT_CACHES_LOCK = get_process_state('object_caches_lock', threading.Lock)
+
+
+def get_object_cache(api_version, kind, config_file=None, context=None,
+                     max_staleness=30, namespace=None):
+    """Return the `ObjectCache` for a kind, creating it if needed.
+
+    Caches are shared by all callers in the current process. If `namespace`
+    is set, only objects from this namespace are cached.
+    """
+    kind_info = get_kind_info({'apiVersion': api_version, 'kind': kind})
+    if namespace is not None and \
+            not kind_info.scope == ObjectScope.NAMESPACE:
+        raise ValueError(
+            'Cannot cache objects of cluster-scoped kind "{}/{}" '
+            'in a namespace'.format(api_version, kind)
+        )
+
+    key = (api_version, kind, config_file, context, namespace)
+    name = '{}/{}'.format(api_version, kind)
+    if namespace is not None:
+        name = '{} in {}'.format(name, namespace)
+
+    with _OBJECT_CACHES_LOCK:
+        cache = _OBJECT_CACHES.get(key)
+        if cache is None:
+            cache = _OBJECT_CACHES[key] = ObjectCache(
+                name,
+                kind_info,
+                config_file=config_file,
+                context=context,
+                max_staleness=max_staleness,
+                namespace=namespace,
+            )
+    return cache
+
+
+def stop_object_caches():
+    """Stop all object caches, and drop them."""
+    with _OBJECT_CACHES_LOCK:
+        caches = list(_OBJECT_CACHES.values())
+        _OBJECT_CACHES.clear()
+    for cache in caches:
+        cache.stop()
+
+
+def get_object_caches_stats():
+    """Return the counters of all object caches, keyed by kind."""
+    with _OBJECT_CACHES_LOCK:
+        caches = list(_OBJECT_CACHES.items())
+    return dict((cache.name, cache.stats()) for _, cache in caches)
+
+
+def match_label_selector(selector, labels):
+    """Check if an equality-based label selector matches the given labels.
+
+    Raises a ValueError for set-based requirements, which are not supported.
+
+    >>> match_label_selector('app=foo,tier!=db', {'app': 'foo'})
+    True
+    >>> match_label_selector('app==foo,!deprecated', {'app': 'bar'})
+    False
+    >>> match_label_selector('app', {'app': 'bar'})
+    True
+    """
+    labels = labels or {}
+    for requirement in selector.split(','):
+        requirement = requirement.strip()
+        if not requirement:
+            continue
+        if ' in ' in requirement or ' notin ' in requirement or \
+                '(' in requirement:
+            raise ValueError(
+                'Unsupported label selector: {}'.format(selector)
+            )
+        if '!=' in requirement:
+            key, _, value = requirement.partition('!=')
+            if labels.get(key.strip()) == value.strip():
+                return False
+        elif '=' in requirement:
+            key, _, value = requirement.partition('=')
+            if labels.get(key.strip()) != value.lstrip('=').strip():
+                return False
+        elif requirement.startswith('!'):
+            if requirement[1:].strip() in labels:
+                return False
+        elif requirement not in labels:
+            return False
+    return True
+
+
 def convert_manifest_to_object(manifest, force_custom_object=False):
     """Convert a YAML representation of a K8s object to its Python model.
 
@@ -676,24 +1300,16 @@ def _build_standard_object(model, manifest):
     """Construct an instance of `model` based on its `manifest`.
 
     This method assumes `model` to be a member of `kubernetes.client.models`,
-    so that it can use its `attribute_map` and `swagger_types` attributes.
+    so that it can use its `attribute_map` and `swagger_types` attributes,
+    through a conversion plan (see `_get_conversion_plan`).
     """
-    # `model.attribute_map` contain all attribute correspondance between
-    # snake case and YAML style (camel case) so we need to reverse it
-    # e.g.: {
-    #   'status': 'status', 'kind': 'kind', 'spec': 'spec',
-    #   'api_version': 'apiVersion', 'metadata': 'metadata'
-    # }
-    reverse_attr_map = {
-        value: key for key, value in model.attribute_map.items()
-    }
+    plan = _get_conversion_plan(model)
 
     kwargs = {}
     for src_key, src_value in manifest.items():
-        key = reverse_attr_map.get(src_key, src_key)
-        type_str = model.swagger_types.get(key)
-
-        if type_str is None:
+        try:
+            key, caster = plan[src_key]
+        except KeyError:
             raise ValueError(
                 'Unsupported attribute {} for "{}" object.'.format(
                     src_key, model.__name__
@@ -701,7 +1317,7 @@ def _build_standard_object(model, manifest):
             )
 
         try:
-            value = _cast_value(src_value, type_str)
+            value = caster(src_value)
         except TypeError as exc:
             raise ValueError(
                 'Invalid value for attribute {} of a "{}" object: {}.'.format(
@@ -714,6 +1330,40 @@ def _build_standard_object(model, manifest):
     return model(**kwargs)
 
 
+# Conversion plans and casters are memoized, since they only depend on the
+# (static) declarations of `kubernetes.client.models`
+_CONVERSION_PLANS = {}
+_CASTERS = {}
+
+
+def _get_conversion_plan(model):
+    """Build (once) the conversion plan of a `kubernetes.client` model.
+
+    The plan maps every supported source key (in YAML style, e.g. camel case)
+    to the matching attribute name and a function casting the source value,
+    based on `model.attribute_map` and `model.swagger_types`.
+    """
+    plan = _CONVERSION_PLANS.get(model)
+    if plan is None:
+        plan = {
+            key: (key, _get_caster(type_str))
+            for key, type_str in model.swagger_types.items()
+        }
+        # `model.attribute_map` contain all attribute correspondance between
+        # snake case and YAML style (camel case), which takes precedence
+        # e.g.: {
+        #   'status': 'status', 'kind': 'kind', 'spec': 'spec',
+        #   'api_version': 'apiVersion', 'metadata': 'metadata'
+        # }
+        plan.update({
+            src_key: (key, _get_caster(model.swagger_types[key]))
+            for key, src_key in model.attribute_map.items()
+            if key in model.swagger_types
+        })
+        _CONVERSION_PLANS[model] = plan
+    return plan
+
+
 DICT_PATTERN = re.compile(r'^dict\(str,\s?(?P<value_type>\S+)\)$')
 LIST_PATTERN = re.compile(r'^list\[(?P<value_type>\S+)\]$')
 
@@ -724,85 +1374,134 @@ def _cast_value(value, type_string):
     Used exclusively by `_build_standard_object`, relying on the models
     `swagger_types` declarations for converting manifests into Python objects.
     """
+    return _get_caster(type_string)(value)
+
+
+def _get_caster(type_string):
+    """Build (once) a function casting values to a type declaration."""
+    caster = _CASTERS.get(type_string)
+    if caster is None:
+        caster = _CASTERS[type_string] = _make_caster(type_string)
+    return caster
+
+
+def _skip_none(caster):
     # Special case for None used for exemple when patching to remove key
-    if value is None:
-        return value
+    def _caster(value):
+        if value is None:
+            return value
+        return caster(value)
+    return _caster
 
-    if type_string == 'str':
-        if not isinstance(value, six.string_types):
-            raise _type_error(value, expected='a string')
-        return value
 
-    if type_string == 'bool':
-        if not isinstance(value, bool):
-            raise _type_error(value, expected='a boolean')
-        return value
+def _cast_str(value):
+    if not isinstance(value, six.string_types):
+        raise _type_error(value, expected='a string')
+    return value
 
-    if type_string == 'int':
-        if not isinstance(value, six.integer_types):
-            raise _type_error(value, expected='an integer')
-        return value
 
-    if type_string == 'float':
-        if not isinstance(value, six.integer_types + (float,)):
-            raise _type_error(value, expected='a float')
-        return float(value)
+def _cast_bool(value):
+    if not isinstance(value, bool):
+        raise _type_error(value, expected='a boolean')
+    return value
 
-    if type_string == 'object':
-        # NOTE: this corresponds to fields accepting different types, such as
-        # either string or integer (e.g. for ports or thresholds). As such, we
-        # don't attempt validation. Note however that some cases may require
-        # casting into specific objects, which we don't handle yet.
-        return value
 
-    if type_string == 'datetime':
-        # YAML only supports dates as strings, though we don't know in advance
-        # what format would be used in source manifests (most likely, there
-        # wouldn't be any date). We thus pick the Swagger `date-time` string
-        # format (see swagger.io/docs/specification/data-models/data-types/).
-        try:
-            return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ')
-        except (TypeError, ValueError):
-            raise _type_error(value, expected='a date-time string')
+def _cast_int(value):
+    if not isinstance(value, six.integer_types):
+        raise _type_error(value, expected='an integer')
+    return value
+
+
+def _cast_float(value):
+    if not isinstance(value, six.integer_types + (float,)):
+        raise _type_error(value, expected='a float')
+    return float(value)
+
+
+def _cast_object(value):
+    # NOTE: this corresponds to fields accepting different types, such as
+    # either string or integer (e.g. for ports or thresholds). As such, we
+    # don't attempt validation. Note however that some cases may require
+    # casting into specific objects, which we don't handle yet.
+    return value
+
+
+def _cast_datetime(value):
+    # YAML only supports dates as strings, though we don't know in advance
+    # what format would be used in source manifests (most likely, there
+    # wouldn't be any date). We thus pick the Swagger `date-time` string
+    # format (see swagger.io/docs/specification/data-models/data-types/).
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ')
+    except (TypeError, ValueError):
+        raise _type_error(value, expected='a date-time string')
+
+
+_SIMPLE_CASTERS = {
+    'str': _cast_str,
+    'bool': _cast_bool,
+    'int': _cast_int,
+    'float': _cast_float,
+    'object': _cast_object,
+    'datetime': _cast_datetime,
+}
+
+
+def _make_caster(type_string):
+    if type_string in _SIMPLE_CASTERS:
+        return _skip_none(_SIMPLE_CASTERS[type_string])
 
     dict_match = DICT_PATTERN.match(type_string)
     if dict_match is not None:
-        if not isinstance(value, dict):
-            raise _type_error(value, expected='a dictionary')
+        value_type_str = dict_match.group('value_type')
 
-        if not all(isinstance(key, six.string_types) for key in value.keys()):
-            raise _type_error(value,
-                              expected='a dictionary with string keys only')
+        def _cast_dict(value):
+            if not isinstance(value, dict):
+                raise _type_error(value, expected='a dictionary')
 
-        value_type_str = dict_match.group('value_type')
-        return {
-            key: _cast_value(val, value_type_str)
-            for key, val in value.items()
-        }
+            if not all(isinstance(key, six.string_types)
+                       for key in value.keys()):
+                raise _type_error(
+                    value, expected='a dictionary with string keys only'
+                )
+
+            value_caster = _get_caster(value_type_str)
+            return {key: value_caster(val) for key, val in value.items()}
+
+        return _skip_none(_cast_dict)
 
     list_match = LIST_PATTERN.match(type_string)
     if list_match is not None:
-        if not isinstance(value, list):
-            raise _type_error(value, expected='a list')
-
         value_type_str = list_match.group('value_type')
-        return [_cast_value(val, value_type_str) for val in value]
 
-    try:
-        model = getattr(k8s_client.models, type_string)
-    except AttributeError:
-        # This should never happen, otherwise this function should get updated
-        raise ValueError(
-            'Unknown type string provided: {}.'.format(type_string)
-        )
+        def _cast_list(value):
+            if not isinstance(value, list):
+                raise _type_error(value, expected='a list')
 
-    if not isinstance(value, dict):
-        raise _type_error(
-            value,
-            expected='a dict to cast as a "{}"'.format(model.__name__)
-        )
+            value_caster = _get_caster(value_type_str)
+            return [value_caster(val) for val in value]
+
+        return _skip_none(_cast_list)
+
+    model = getattr(k8s_client.models, type_string, None)
+
+    def _cast_model(value):
+        if model is None:
+            # This should never happen, otherwise this function should get
+            # updated
+            raise ValueError(
+                'Unknown type string provided: {}.'.format(type_string)
+            )
+
+        if not isinstance(value, dict):
+            raise _type_error(
+                value,
+                expected='a dict to cast as a "{}"'.format(model.__name__)
+            )
+
+        return _build_standard_object(model, value)
 
-    return _build_standard_object(model, value)
+    return _skip_none(_cast_model)
 
 
 def _type_error(value, expected):
@@ -838,6 +1537,79 @@ def validate_manifest(manifest):
     return not dictdiff.removed() and not dictdiff.changed()
 
 
+# Fields populated by the API server, which should never be considered as owned
+# by the user when comparing a manifest with an existing object
+SERVER_POPULATED_FIELDS = frozenset([
+    ('status',),
+    ('metadata', 'creation_timestamp'),
+    ('metadata', 'deletion_grace_period_seconds'),
+    ('metadata', 'deletion_timestamp'),
+    ('metadata', 'generation'),
+    ('metadata', 'managed_fields'),
+    ('metadata', 'resource_version'),
+    ('metadata', 'self_link'),
+    ('metadata', 'uid'),
+])
+
+
+def get_diff_paths(manifest, current):
+    """List the fields from `manifest` which differ in the `current` object.
+
+    `current` is expected to be the dict representation of an object, as
+    returned by `kubernetes.client` (or by `CustomObject` for custom kinds).
+
+    Only fields set in the source `manifest` are compared, so defaults and
+    other values filled in by the API server do not count as differences,
+    neither do the fields listed in `SERVER_POPULATED_FIELDS`.
+    """
+    kind_info = get_kind_info(manifest)
+
+    if isinstance(kind_info, CRKindInfo):
+        desired = manifest
+    else:
+        # Round-trip through the model, so that we get the same keys and
+        # value types as in `current`, and `None` for fields not provided
+        desired = _build_standard_object(kind_info.model, manifest).to_dict()
+
+    return [
+        '.'.join(path)
+        for path in _diff_paths(desired, current, ())
+    ]
+
+
+def _diff_paths(desired, current, path):
+    if desired is None:
+        # Not set in the manifest, hence not owned by the user
+        return []
+
+    if isinstance(desired, dict):
+        if not isinstance(current, dict):
+            return [path]
+        diffs = []
+        for key, value in desired.items():
+            sub_path = path + (key, )
+            normalized = tuple(_convert_attribute_name(k) for k in sub_path)
+            if normalized in SERVER_POPULATED_FIELDS:
+                continue
+            diffs.extend(_diff_paths(value, current.get(key), sub_path))
+        return diffs
+
+    if isinstance(desired, list):
+        if not isinstance(current, list) or len(desired) != len(current):
+            return [path]
+        diffs = []
+        for index, (value, current_value) in enumerate(zip(desired, current)):
+            diffs.extend(_diff_paths(
+                value, current_value, path + (str(index), )
+            ))
+        return diffs
+
+    if desired != current:
+        return [path]
+
+    return []
+
+
 def _cast_dict_keys(data, key_cast):
     """Converts all dict keys in `data` using `key_cast`, recursively.
 
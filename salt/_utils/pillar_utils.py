@@ -5,6 +5,28 @@ The utilities contained in this module have no external dependencies, so
 they may be imported as is in external pillar modules.
 """
 
+import errno
+import fcntl
+import functools
+import logging
+import os
+import re
+import threading
+import time
+
+
+log = logging.getLogger(__name__)
+
+# Renders slower than this (in seconds) are logged as warnings
+SLOW_PILLAR_THRESHOLD = 2.0
+
+# Name of the Prometheus textfile, shared by all salt-master processes
+TEXTFILE_NAME = 'metalk8s_pillar.prom'
+
+# Interval (in seconds) at which recorded timings are written to the textfile
+TEXTFILE_WRITE_INTERVAL = 10
+
+
 def assert_equals(source_dict, expected_dict):
     """
     Check equality with expected values in dictionary keys.
@@ -77,3 +99,282 @@ def errors_to_dict(error_list):
      dict: a dict with `_errors` key and error list value
     """
     return {'_errors': error_list}
+
+
+def instrument(name, func, opts, utils=None):
+    """
+    Wrap an external pillar function, to record timing of its renders.
+
+    Wall time, and Kubernetes API calls and received bytes (as counted by the
+    `metalk8s_kubernetes` utils, if available in `utils`) are recorded for
+    each ext_pillar and minion.
+    Note that API counters are process-wide, so calls made concurrently by
+    other threads may be accounted for.
+
+    Behaviour is configured with the `metalk8s.pillar_timing` option of the
+    salt-master configuration:
+
+    .. code-block:: yaml
+
+        metalk8s.pillar_timing:
+          # Log renders slower than this (in seconds) as warnings
+          slow_threshold: 2.0
+          # Expose timings under `metalk8s:debug:pillar_timing` in pillar
+          debug: false
+          # Directory where to write a Prometheus textfile
+          textfile_dir: /var/lib/node_exporter/textfile_collector
+
+    Args:
+     - name      (str): the ext_pillar name
+     - func (callable): the actual ext_pillar function
+     - opts     (dict): the salt-master options
+     - utils    (dict): the utils modules available to the ext_pillar
+
+    Returns:
+     callable: the wrapped ext_pillar function
+    """
+    config = opts.get('metalk8s.pillar_timing') or {}
+    get_api_stats = (utils or {}).get('metalk8s_kubernetes.get_api_stats')
+    store = _get_timing_store(utils)
+
+    def timed(minion_id, pillar, *args, **kwargs):
+        api_before = get_api_stats() if get_api_stats else {}
+        start = time.time()
+        try:
+            result = func(minion_id, pillar, *args, **kwargs)
+        finally:
+            duration = time.time() - start
+            api_after = get_api_stats() if get_api_stats else {}
+            timing = {
+                'duration': round(duration, 6),
+                'api_calls': (
+                    api_after.get('calls', 0) - api_before.get('calls', 0)
+                ),
+                'api_bytes': (
+                    api_after.get('bytes', 0) - api_before.get('bytes', 0)
+                ),
+            }
+            _record_timing(store, name, minion_id, timing, config)
+
+        if config.get('debug'):
+            result.setdefault('metalk8s', {}).setdefault(
+                'debug', {}
+            ).setdefault('pillar_timing', {})[name] = timing
+
+        return result
+
+    return timed
+
+
+def timed(func):
+    """
+    Decorate an external pillar function with `instrument`.
+
+    The ext_pillar name, salt-master options and utils are read from the
+    `__virtualname__`, `__opts__` and `__utils__` globals of the module
+    defining `func`, when it is called (the Salt loader only injects them
+    once the module is loaded). Since external pillars cannot import this
+    module, they use it through `__utils__`:
+
+    .. code-block:: python
+
+        def ext_pillar(minion_id, pillar, kubeconfig):
+            return __utils__['pillar_utils.timed'](_ext_pillar)(
+                minion_id, pillar, kubeconfig
+            )
+
+    Args:
+     - func (callable): the actual ext_pillar function
+
+    Returns:
+     callable: the wrapped ext_pillar function
+    """
+    @functools.wraps(func)
+    def wrapper(minion_id, pillar, *args, **kwargs):
+        module_globals = func.__globals__
+        timed_func = instrument(
+            module_globals.get('__virtualname__', func.__module__),
+            func,
+            module_globals.get('__opts__') or {},
+            module_globals.get('__utils__'),
+        )
+        return timed_func(minion_id, pillar, *args, **kwargs)
+
+    return wrapper
+
+
+class _TimingStore(object):
+    """Last render timings of the ext_pillars rendered by this process.
+
+    Timings are written to the textfile in batches, by a timer running at
+    most every `TEXTFILE_WRITE_INTERVAL` seconds, so that refreshing the
+    pillar of many minions does not rewrite the file for each render.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._pending = {}
+        self._timer = None
+
+    def timings(self):
+        with self._lock:
+            return dict(self._timings)
+
+    def record(self, name, minion_id, timing, textfile_dir=None):
+        with self._lock:
+            self._timings[(name, minion_id)] = timing
+            if not textfile_dir:
+                return
+            self._pending.setdefault(
+                textfile_dir, {}
+            )[(name, minion_id)] = timing
+            if self._timer is None:
+                self._timer = threading.Timer(
+                    TEXTFILE_WRITE_INTERVAL, self.flush
+                )
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write the pending timings to their textfile."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._timer = None
+
+        for textfile_dir, timings in pending.items():
+            try:
+                _update_textfile(textfile_dir, timings)
+            except (IOError, OSError) as exc:
+                log.warning('Unable to write pillar timing metrics: %s', exc)
+
+
+# Used when the `metalk8s_kubernetes` utils are not available, in which case
+# timings are lost whenever this module is loaded again
+_LOCAL_TIMING_STORE = _TimingStore()
+
+
+def _get_timing_store(utils=None):
+    """Return the process-wide `_TimingStore`.
+
+    This module is loaded again for each pillar compilation, so the store is
+    kept with `metalk8s_kubernetes.get_process_state`, if available.
+    """
+    get_process_state = (utils or {}).get(
+        'metalk8s_kubernetes.get_process_state'
+    )
+    if get_process_state is None:
+        return _LOCAL_TIMING_STORE
+    return get_process_state('pillar_utils.timings', _TimingStore)
+
+
+def get_pillar_timings(utils=None):
+    """
+    Return the last timing of each external pillar rendered by this process.
+
+    Args:
+     - utils (dict): the utils modules available, to reach the process-wide
+                     timings
+
+    Returns:
+     dict: a dict of ext_pillar names, each a dict of timings by minion ID
+    """
+    result = {}
+    timings = _get_timing_store(utils).timings()
+    for (name, minion_id), timing in timings.items():
+        result.setdefault(name, {})[minion_id] = dict(timing)
+    return result
+
+
+def _record_timing(store, name, minion_id, timing, config):
+    threshold = config.get('slow_threshold', SLOW_PILLAR_THRESHOLD)
+    if timing['duration'] > threshold:
+        log.warning(
+            "Slow ext_pillar '%s' for minion '%s': %.3fs "
+            "(%d API calls, %d bytes)",
+            name, minion_id, timing['duration'],
+            timing['api_calls'], timing['api_bytes']
+        )
+    else:
+        log.debug(
+            "Rendered ext_pillar '%s' for minion '%s' in %.3fs "
+            "(%d API calls, %d bytes)",
+            name, minion_id, timing['duration'],
+            timing['api_calls'], timing['api_bytes']
+        )
+
+    store.record(
+        name, minion_id, timing, textfile_dir=config.get('textfile_dir')
+    )
+
+
+_METRICS = [
+    ('duration', 'metalk8s_pillar_render_duration_seconds',
+     'Wall time of the last render of an ext_pillar'),
+    ('api_calls', 'metalk8s_pillar_render_api_calls',
+     'Kubernetes API calls made during the last render of an ext_pillar'),
+    ('api_bytes', 'metalk8s_pillar_render_api_bytes',
+     'Bytes received from the Kubernetes API during the last render of an '
+     'ext_pillar'),
+]
+
+
+_SAMPLE_RE = re.compile(
+    r'^(?P<metric>\w+)'
+    r'\{pillar="(?P<name>[^"]*)",minion="(?P<minion>[^"]*)"\} '
+    r'(?P<value>\S+)$'
+)
+
+
+def _read_textfile(path):
+    """Read timings from a textfile written by `_write_textfile`."""
+    keys = dict((metric, key) for key, metric, _ in _METRICS)
+    timings = {}
+    try:
+        with open(path) as fd:
+            for line in fd:
+                match = _SAMPLE_RE.match(line.strip())
+                if match and match.group('metric') in keys:
+                    timing = timings.setdefault(
+                        (match.group('name'), match.group('minion')), {}
+                    )
+                    timing[keys[match.group('metric')]] = \
+                        match.group('value')
+    except IOError as exc:
+        if exc.errno != errno.ENOENT:
+            raise
+    return timings
+
+
+def _write_textfile(path, timings):
+    """Write timings in Prometheus text format, atomically."""
+    lines = []
+    for key, metric, help_text in _METRICS:
+        lines.append('# HELP {} {}.'.format(metric, help_text))
+        lines.append('# TYPE {} gauge'.format(metric))
+        for (name, minion_id), timing in sorted(timings.items()):
+            if key in timing:
+                lines.append('{}{{pillar="{}",minion="{}"}} {}'.format(
+                    metric, name, minion_id, timing[key]
+                ))
+
+    tmp_path = '{}.tmp'.format(path)
+    with open(tmp_path, 'w') as fd:
+        fd.write('\n'.join(lines) + '\n')
+    os.rename(tmp_path, path)
+
+
+def _update_textfile(textfile_dir, timings):
+    """Update timings of ext_pillars and minions in the textfile.
+
+    The textfile is shared by all salt-master processes, so it is updated
+    under a lock, keeping timings recorded by other processes.
+    """
+    path = os.path.join(textfile_dir, TEXTFILE_NAME)
+    with open('{}.lock'.format(path), 'a') as lock_fd:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        try:
+            all_timings = _read_textfile(path)
+            all_timings.update(timings)
+            _write_textfile(path, all_timings)
+        finally:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
@@ -6,6 +6,12 @@ import contextlib
 import ctypes
 import ctypes.util
 import functools
+import logging
+import os
+import stat
+
+
+log = logging.getLogger(__name__)
 
 
 __virtualname__ = 'metalk8s_volumes'
@@ -352,5 +358,77 @@ def get_partition_flags(*args):
     return _get_flags(PartitionFlags, 'partitions', 0, *args)
 
 
+# }}}
+# Probe cache {{{
+
+
+# DeviceInfo by (path, probe configuration), along with the key identifying
+# the state of the device when it was probed.
+_DEVICE_INFO_CACHE = {}
+
+
+def _get_device_key(path):
+    """Return a key changing whenever the file is modified.
+
+    Returns None for block devices: their content can change (e.g. written
+    through a partition or another device node) without their node changing,
+    so they cannot be cached.
+    """
+    stats = os.stat(path)
+    if stat.S_ISBLK(stats.st_mode):
+        return None
+    return (stats.st_ino, stats.st_mtime, stats.st_size)
+
+
+def probe_device(path, use_cache=True, **kwargs):
+    """Probe a device, reusing the cached information if it did not change.
+
+    `kwargs` are the probe configuration, as accepted by `get_blkid_probe`.
+    The cached information is only used if the file's inode, mtime and
+    size did not change since it was probed. Block devices are always probed.
+    """
+    cache_key = (path, tuple(sorted(kwargs.items())))
+    try:
+        device_key = _get_device_key(path)
+    except OSError:
+        device_key = None
+
+    if use_cache and device_key is not None:
+        cached = _DEVICE_INFO_CACHE.get(cache_key)
+        if cached is not None and cached[0] == device_key:
+            return cached[1]
+
+    with get_blkid_probe(path, **kwargs) as probe:
+        info = probe.probe()
+
+    if device_key is None:
+        _DEVICE_INFO_CACHE.pop(cache_key, None)
+    else:
+        _DEVICE_INFO_CACHE[cache_key] = (device_key, info)
+    return info
+
+
+def probe_devices(paths, use_cache=True, **kwargs):
+    """Probe several devices in one pass.
+
+    Returns the DeviceInfo of each device, by path. Devices which cannot be
+    probed (e.g. missing ones) are left out.
+    """
+    infos = {}
+    for path in paths:
+        try:
+            infos[path] = probe_device(path, use_cache=use_cache, **kwargs)
+        except (BlkidError, OSError) as exn:
+            log.debug('cannot probe %s: %s', path, exn)
+    return infos
+
+
+def invalidate_device_info(path=None):
+    """Drop the cached information of a device (or of all devices)."""
+    for cache_key in list(_DEVICE_INFO_CACHE):
+        if path is None or cache_key[0] == path:
+            del _DEVICE_INFO_CACHE[cache_key]
+
+
 # }}}
 # }}}
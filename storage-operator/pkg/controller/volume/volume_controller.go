@@ -17,6 +17,7 @@ import (
 	metav1 "k8s.io/apimachinery/pkg/apis/meta/v1"
 	"k8s.io/apimachinery/pkg/runtime"
 	"k8s.io/apimachinery/pkg/types"
+	"k8s.io/apimachinery/pkg/util/validation"
 	"k8s.io/client-go/rest"
 	"k8s.io/client-go/tools/record"
 	"sigs.k8s.io/controller-runtime/pkg/client"
@@ -198,6 +199,7 @@ reclaim its storage and remove the finalizers to let the object be deleted.
 }}} */
 
 const VOLUME_PROTECTION = "storage.metalk8s.scality.com/volume-protection"
+const VOLUME_NODE_LABEL = "storage.metalk8s.scality.com/node"
 const JOB_DONE_MARKER = "DONE"
 
 var log = logf.Log.WithName("volume-controller")
@@ -412,6 +414,31 @@ func (self *ReconcileVolume) removeVolumeFinalizer(
 	return self.client.Update(ctx, volume)
 }
 
+// Set the node-name label on the volume (if not already up-to-date).
+//
+// This allows to list the volumes of a node using a label selector.
+// Node names which are not valid label values (e.g. longer than 63
+// characters) are skipped: such volumes are listed along with the unlabeled
+// ones.
+func (self *ReconcileVolume) setVolumeNodeLabel(
+	ctx context.Context, volume *storagev1alpha1.Volume,
+) error {
+	nodeName := string(volume.Spec.NodeName)
+	if len(validation.IsValidLabelValue(nodeName)) != 0 {
+		return nil
+	}
+	labels := volume.GetLabels()
+	if value, found := labels[VOLUME_NODE_LABEL]; found && value == nodeName {
+		return nil
+	}
+	if labels == nil {
+		labels = make(map[string]string)
+	}
+	labels[VOLUME_NODE_LABEL] = nodeName
+	volume.SetLabels(labels)
+	return self.client.Update(ctx, volume)
+}
+
 // Get the disk size for the volume.
 func (self *ReconcileVolume) getDiskSizeForVolume(
 	ctx context.Context, volume *storagev1alpha1.Volume,
@@ -581,6 +608,11 @@ func (r *ReconcileVolume) Reconcile(request reconcile.Request) (reconcile.Result
 			"invalid volume: %s", err.Error(),
 		)
 	}
+	// The label is only an optimization for listing volumes: do not block
+	// the reconciliation on it.
+	if err := r.setVolumeNodeLabel(ctx, volume); err != nil {
+		reqLogger.Error(err, "cannot set node-name label")
+	}
 	saltenv, err := r.fetchSaltEnv(ctx, string(volume.Spec.NodeName))
 	if err != nil {
 		reqLogger.Error(err, "cannot compute saltenv")